@@ -13,40 +13,994 @@ Author: Cisco Development Team
 Date: February 5, 2026
 """
 
-from flask import Flask, request, jsonify
-from typing import List, Dict, Any, Optional, Iterator
-from datetime import datetime
-from collections import defaultdict
-from operator import itemgetter
+from flask import Flask, Response, request
+from flask.json.provider import JSONProvider
+from flask_caching import Cache
+from werkzeug.exceptions import BadRequest, HTTPException, RequestEntityTooLarge
+from typing import List, Dict, Any, Optional, Sequence, Callable
+from datetime import datetime, timedelta, timezone
+from bisect import bisect_left, bisect_right, insort
+from functools import lru_cache, wraps
+from itertools import chain, islice
+from urllib.parse import urlencode
+import copy
 import json
+import threading
+import zlib
 
+import numpy as np
+import orjson
+
+try:
+    from numba import njit, prange, get_num_threads, get_thread_id
+except ImportError:  # numba is optional; fall back to NumPy kernels
+    njit = None
+    prange = range
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; only needed for Arrow/Parquet export
+    pa = None
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+    
+    Flask routes request.get_json() and its own JSON helpers through the
+    app's provider, so batch-upload parsing uses orjson's C parser too.
+    """
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
+# Upper bound on a request body, both as sent and after gzip inflation
+MAX_BODY_SIZE = 64 * 1024 * 1024
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+app.config['MAX_CONTENT_LENGTH'] = MAX_BODY_SIZE
+
+# Process-local response cache; keys embed the store generation, so
+# entries never go stale and need no expiry
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 0})
+
+
+def fast_json(obj: Any, status: int = 200) -> Response:
+    """
+    Serialize a response body with orjson instead of jsonify.
+    
+    orjson's C encoder is several times faster than the stdlib encoder and
+    serializes NumPy scalars and arrays natively, so columns need no
+    .tolist() copy.
+    """
+    return Response(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+                    status=status, mimetype='application/json')
+
+
+def request_json() -> Any:
+    """
+    Parse the request body as JSON, inflating Content-Encoding: gzip first.
+    
+    Large batch uploads are highly redundant JSON, so clients may send them
+    compressed; plain bodies still go through Flask's (orjson) provider.
+    Gzip bodies are inflated in bounded steps, so a small compressed body
+    cannot expand past MAX_BODY_SIZE in memory.
+    
+    Raises:
+        RequestEntityTooLarge: The inflated body exceeds MAX_BODY_SIZE
+        BadRequest: The body is not valid gzip or not valid JSON
+    """
+    if request.content_encoding != 'gzip':
+        return request.get_json()
+    
+    decompressor = zlib.decompressobj(wbits=31)
+    chunks, size = [], 0
+    data = request.get_data()
+    try:
+        while data:
+            # One byte over the remaining budget is enough to detect overflow
+            chunk = decompressor.decompress(data, MAX_BODY_SIZE - size + 1)
+            size += len(chunk)
+            if size > MAX_BODY_SIZE:
+                raise RequestEntityTooLarge('Decompressed body is too large')
+            chunks.append(chunk)
+            data = decompressor.unconsumed_tail
+            if decompressor.eof and decompressor.unused_data:
+                # Concatenated gzip members (cat a.gz b.gz) are one body;
+                # the rest inflates under the same size budget
+                data = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=31)
+    except zlib.error as e:
+        raise BadRequest(f'Invalid gzip body: {str(e)}')
+    if not decompressor.eof:
+        raise BadRequest('Invalid gzip body: truncated stream')
+    
+    try:
+        return orjson.loads(b''.join(chunks))
+    except orjson.JSONDecodeError as e:
+        raise BadRequest(f'Invalid JSON: {str(e)}')
+
+
+def cached_response(view: Callable[..., Response]) -> Callable[..., Response]:
+    """
+    Cache a read-only view's serialized body between writes.
+    
+    The key combines the view name, the store generation (bumped on every
+    insert and clear) and the sorted query args. Only 200 responses are
+    cached, as pre-encoded bytes, so hits skip aggregation and encoding.
+    """
+    @wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Response:
+        key = '{}:{}:{}'.format(view.__name__, transactions_db.generation,
+                                urlencode(sorted(request.args.items(multi=True))))
+        body = cache.get(key)
+        if body is None:
+            response = view(*args, **kwargs)
+            if response.status_code != 200:
+                return response
+            body = response.get_data()
+            cache.set(key, body)
+        return Response(body, status=200, mimetype='application/json')
+    return wrapper
+
+
+# ============================================================================
+# Aggregation Kernels
+# ============================================================================
+
+def _accumulate_products_loop(product_codes: np.ndarray, amounts: np.ndarray,
+                              quantities: np.ndarray, total_sales: np.ndarray,
+                              total_quantity: np.ndarray,
+                              transaction_count: np.ndarray) -> None:
+    """Add a batch of rows into the per-product accumulators in place."""
+    for i in range(len(product_codes)):
+        product = product_codes[i]
+        total_sales[product] += amounts[i]
+        total_quantity[product] += quantities[i]
+        transaction_count[product] += 1
+
+
+def _accumulate_products_numpy(product_codes: np.ndarray, amounts: np.ndarray,
+                               quantities: np.ndarray, total_sales: np.ndarray,
+                               total_quantity: np.ndarray,
+                               transaction_count: np.ndarray) -> None:
+    """Vectorized NumPy equivalent of _accumulate_products_loop."""
+    np.add.at(total_sales, product_codes, amounts)
+    np.add.at(total_quantity, product_codes, quantities)
+    np.add.at(transaction_count, product_codes, 1)
+
+
+def _accumulate_customers_loop(customer_codes: np.ndarray, amounts: np.ndarray,
+                               quantities: np.ndarray, product_codes: np.ndarray,
+                               total_spent: np.ndarray, total_transactions: np.ndarray,
+                               total_items: np.ndarray, product_bits: np.ndarray) -> None:
+    """
+    Add a batch of rows into the per-customer accumulators in place.
+    
+    product_bits is a uint64[customers, ceil(products / 64)] bitset matrix
+    with bit p set when the customer bought product code p; recording a
+    purchase is a single OR and counting distinct products is a popcount.
+    """
+    for i in range(len(customer_codes)):
+        customer = customer_codes[i]
+        product = product_codes[i]
+        total_spent[customer] += amounts[i]
+        total_transactions[customer] += 1
+        total_items[customer] += quantities[i]
+        product_bits[customer, product >> 6] |= np.uint64(1) << np.uint64(product & 63)
+
+
+def _accumulate_customers_numpy(customer_codes: np.ndarray, amounts: np.ndarray,
+                                quantities: np.ndarray, product_codes: np.ndarray,
+                                total_spent: np.ndarray, total_transactions: np.ndarray,
+                                total_items: np.ndarray, product_bits: np.ndarray) -> None:
+    """Vectorized NumPy equivalent of _accumulate_customers_loop."""
+    np.add.at(total_spent, customer_codes, amounts)
+    np.add.at(total_transactions, customer_codes, 1)
+    np.add.at(total_items, customer_codes, quantities)
+    np.bitwise_or.at(product_bits, (customer_codes, product_codes >> 6),
+                     np.left_shift(np.uint64(1), (product_codes & 63).astype(np.uint64)))
+
+
+def _accumulate_products_parallel(product_codes: np.ndarray, amounts: np.ndarray,
+                                  quantities: np.ndarray, total_sales: np.ndarray,
+                                  total_quantity: np.ndarray,
+                                  transaction_count: np.ndarray, n_threads: int) -> None:
+    """
+    Multi-core _accumulate_products_loop for large batches.
+    
+    Each thread adds into its own row of a [threads, groups] accumulator, so
+    the scan needs no locks; the rows are reduced into the totals at the end.
+    n_threads is passed in because reading it inside the kernel would stop
+    numba from caching the compiled code.
+    """
+    n_groups = len(total_sales)
+    sales = np.zeros((n_threads, n_groups))
+    quantity = np.zeros((n_threads, n_groups))
+    count = np.zeros((n_threads, n_groups), dtype=np.int64)
+    
+    for i in prange(len(product_codes)):
+        thread = get_thread_id()
+        product = product_codes[i]
+        sales[thread, product] += amounts[i]
+        quantity[thread, product] += quantities[i]
+        count[thread, product] += 1
+    
+    for thread in range(n_threads):
+        for group in range(n_groups):
+            total_sales[group] += sales[thread, group]
+            total_quantity[group] += quantity[thread, group]
+            transaction_count[group] += count[thread, group]
+
+
+def _accumulate_customers_parallel(customer_codes: np.ndarray, amounts: np.ndarray,
+                                   quantities: np.ndarray, product_codes: np.ndarray,
+                                   total_spent: np.ndarray, total_transactions: np.ndarray,
+                                   total_items: np.ndarray, product_bits: np.ndarray,
+                                   n_threads: int) -> None:
+    """
+    Multi-core _accumulate_customers_loop for large batches.
+    
+    Sums use per-thread accumulators as in _accumulate_products_parallel.
+    The bit-matrix is ORed in a serial pass: concurrent byte updates could
+    lose bits, and per-thread copies of the matrix would cost too much memory.
+    """
+    n_groups = len(total_spent)
+    spent = np.zeros((n_threads, n_groups))
+    transactions = np.zeros((n_threads, n_groups), dtype=np.int64)
+    items = np.zeros((n_threads, n_groups))
+    
+    for i in prange(len(customer_codes)):
+        thread = get_thread_id()
+        customer = customer_codes[i]
+        spent[thread, customer] += amounts[i]
+        transactions[thread, customer] += 1
+        items[thread, customer] += quantities[i]
+    
+    for thread in range(n_threads):
+        for group in range(n_groups):
+            total_spent[group] += spent[thread, group]
+            total_transactions[group] += transactions[thread, group]
+            total_items[group] += items[thread, group]
+    
+    for i in range(len(customer_codes)):
+        product = product_codes[i]
+        product_bits[customer_codes[i], product >> 6] |= np.uint64(1) << np.uint64(product & 63)
+
+
+# Batches at least this large use the multi-core kernels; below it thread
+# start-up and the per-thread reduction cost more than they save
+PARALLEL_BATCH_THRESHOLD = 1 << 16
+
+# Numba compiles one specialization per argument dtype combination and
+# caches it on disk, so only the first request after install pays for JIT
+if njit is not None:
+    accumulate_products = njit(cache=True)(_accumulate_products_loop)
+    accumulate_customers = njit(cache=True)(_accumulate_customers_loop)
+    _products_parallel_kernel = njit(parallel=True, cache=True)(_accumulate_products_parallel)
+    _customers_parallel_kernel = njit(parallel=True, cache=True)(_accumulate_customers_parallel)
+    
+    def accumulate_products_parallel(*args: np.ndarray) -> None:
+        _products_parallel_kernel(*args, get_num_threads())
+    
+    def accumulate_customers_parallel(*args: np.ndarray) -> None:
+        _customers_parallel_kernel(*args, get_num_threads())
+else:
+    accumulate_products = accumulate_products_parallel = _accumulate_products_numpy
+    accumulate_customers = accumulate_customers_parallel = _accumulate_customers_numpy
+
+
+def use_parallel(n_rows: int, n_groups: int) -> bool:
+    """
+    Whether a batch of n_rows over n_groups groups should use the multi-core kernels.
+    
+    The parallel kernels allocate and reduce n_threads * n_groups cells per
+    accumulator, sized by every group in the store rather than the batch,
+    so they only pay off while that stays within the batch size.
+    """
+    if njit is None or n_rows < PARALLEL_BATCH_THRESHOLD:
+        return False
+    return get_num_threads() * n_groups <= n_rows
+
+
+def _grow(array: np.ndarray, length: int, axis: int = 0,
+          copy: bool = False) -> np.ndarray:
+    """
+    Zero-pad `array` along `axis` to at least `length` (amortized doubling).
+    
+    With copy=True the result never aliases `array`, even when no growth
+    is needed.
+    """
+    current = array.shape[axis]
+    if length <= current:
+        return array.copy() if copy else array
+    padding = [(0, 0)] * array.ndim
+    padding[axis] = (0, max(length, current * 2) - current)
+    return np.pad(array, padding)
+
+
+# ============================================================================
+# Columnar Transaction Store
+# ============================================================================
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Timestamps are stored as int64 ns, covering roughly 1677-09-21 to 2262-04-11
+_NS_MIN, _NS_MAX = int(np.iinfo(np.int64).min), int(np.iinfo(np.int64).max)
+
+
+def to_unix_ns(value: datetime) -> int:
+    """
+    Convert a datetime to integer nanoseconds since the Unix epoch.
+    
+    Naive datetimes are taken as UTC; aware ones are normalized to UTC.
+    Integer arithmetic keeps microsecond precision exact.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10**9 + delta.microseconds * 1000
+
+
+def from_unix_ns(value: int, utc: bool = False) -> str:
+    """
+    Format integer nanoseconds since the Unix epoch as an ISO timestamp.
+    
+    With utc=True the result carries an explicit +00:00 offset, for values
+    that were uploaded with an offset and normalized to UTC.
+    """
+    moment = _EPOCH + timedelta(microseconds=int(value) // 1000)
+    return (moment.replace(tzinfo=timezone.utc) if utc else moment).isoformat()
+
+
+def stage_codes(index: Dict[Any, int], values: Sequence[Any]) -> tuple:
+    """
+    Look up codes for `values`, provisionally numbering unseen ones.
+    
+    `index` is not modified: unseen values get codes from len(index) up in
+    first-seen order, and the caller adds them once the batch is built.
+    
+    Returns:
+        Tuple of (codes, new) where new holds the position in values of
+        each unseen value's first occurrence, in code order
+    """
+    staged: Dict[Any, int] = {}
+    codes, new = [], []
+    next_code = len(index)
+    for position, value in enumerate(values):
+        code = index.get(value)
+        if code is None:
+            code = staged.get(value)
+            if code is None:
+                code = staged[value] = next_code + len(new)
+                new.append(position)
+        codes.append(code)
+    return codes, new
+
+
+def as_quantity(value: float) -> Any:
+    """
+    Return a stored quantity as an int when it is a whole number.
+    
+    Quantity columns are float64 so fractional quantities fit, but whole
+    quantities go out as JSON integers, as the uploaded values were.
+    """
+    return int(value) if value.is_integer() and abs(value) < 2**53 else value
+
+
+class Dictionary:
+    """Dictionary encoder mapping values to dense int32 codes in first-seen order."""
+    
+    def __init__(self) -> None:
+        self.index: Dict[Any, int] = {}
+        self.values: List[Any] = []
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def add(self, value: Any) -> int:
+        """Assign the next code to an unseen `value` and return it."""
+        code = len(self.values)
+        self.values.append(value)
+        self.index[value] = code
+        return code
+
+
+class Ranking:
+    """
+    Sorted sequence that store versions share through copy-on-write chunks.
+    
+    Items live in sorted chunks of at most 2 * CHUNK_SIZE entries. copy()
+    duplicates only the list of chunk references, and add() / remove()
+    replace the single chunk they change, so publishing a version costs
+    O(n / CHUNK_SIZE + t * CHUNK_SIZE) for t updates instead of O(n).
+    """
+    
+    CHUNK_SIZE = 256
+    
+    def __init__(self) -> None:
+        self._chunks: List[List[Any]] = []
+        self._maxes: List[Any] = []
+        self._len = 0
+    
+    def __len__(self) -> int:
+        return self._len
+    
+    def copy(self) -> 'Ranking':
+        """Return a version sharing every chunk with this one."""
+        new = Ranking()
+        new._chunks = list(self._chunks)
+        new._maxes = list(self._maxes)
+        new._len = self._len
+        return new
+    
+    def add(self, item: Any) -> None:
+        if not self._chunks:
+            self._chunks.append([item])
+            self._maxes.append(item)
+            self._len = 1
+            return
+        index = min(bisect_left(self._maxes, item), len(self._chunks) - 1)
+        # Copy before writing: the chunk may belong to older versions too
+        chunk = self._chunks[index][:]
+        insort(chunk, item)
+        self._len += 1
+        if len(chunk) > 2 * self.CHUNK_SIZE:
+            half = len(chunk) // 2
+            self._chunks[index:index + 1] = [chunk[:half], chunk[half:]]
+            self._maxes[index:index + 1] = [chunk[half - 1], chunk[-1]]
+        else:
+            self._chunks[index] = chunk
+            self._maxes[index] = chunk[-1]
+    
+    def remove(self, item: Any) -> None:
+        index = bisect_left(self._maxes, item)
+        chunk = self._chunks[index][:] if index < len(self._chunks) else []
+        position = bisect_left(chunk, item)
+        if position == len(chunk) or chunk[position] != item:
+            raise ValueError(f'{item!r} not in ranking')
+        del chunk[position]
+        self._len -= 1
+        if chunk:
+            self._chunks[index] = chunk
+            self._maxes[index] = chunk[-1]
+        else:
+            del self._chunks[index]
+            del self._maxes[index]
+    
+    def bisect_right(self, item: Any) -> int:
+        """Number of items less than or equal to `item`."""
+        index = bisect_right(self._maxes, item)
+        if index == len(self._chunks):
+            return self._len
+        return (sum(len(chunk) for chunk in self._chunks[:index])
+                + bisect_right(self._chunks[index], item))
+    
+    def islice(self, start: int, stop: int) -> Any:
+        """Iterate over items [start, stop) in sorted order."""
+        return islice(chain.from_iterable(self._chunks), start, stop)
+
+
+# Bit row of a customer with no products yet; shared and read-only
+_NO_PRODUCTS = np.zeros(0, dtype=np.uint64)
+_NO_PRODUCTS.flags.writeable = False
+
+
+class Store:
+    """
+    Struct-of-arrays store for sales transactions.
+    
+    Numeric fields live in contiguous NumPy columns so the aggregation and
+    filter endpoints can run vectorized passes over only the columns they
+    need. Customer and product IDs and names are dictionary-encoded into
+    int32 code columns, so each distinct string is stored once and
+    comparisons are integer; only transaction IDs stay in an object column.
+    
+    Per-product and per-customer totals are accumulated on insert, indexed
+    by code, so the aggregation endpoints read O(groups) instead of
+    rescanning every row. Customers are additionally kept ranked by total
+    spent so top-K reads never sort.
+    
+    A Store instance is an immutable snapshot: with_batch() returns the
+    next version instead of mutating this one. Column buffers, ID
+    dictionaries and postings are append-only and shared between versions
+    (each version only reads up to its own size and group counts). The
+    numeric aggregates are copied on write; per-customer product bits and
+    ranking chunks are shared, and only those a batch touches are replaced.
+    """
+    
+    INITIAL_CAPACITY = 1024
+    GROUP_CAPACITY = 64
+    
+    COLUMN_DTYPES: Dict[str, Any] = {
+        'quantity': np.float64,
+        'price': np.float64,
+        'total_amount': np.float64,
+        'customer_code': np.int32,
+        'product_code': np.int32,
+        'customer_name_code': np.int32,
+        'product_name_code': np.int32,
+        'timestamp_ns': np.int64,
+        'timestamp_utc': bool,
+        'transaction_id': object,
+        'extra': object
+    }
+    
+    CORE_FIELDS = frozenset(['transaction_id', 'customer_id', 'customer_name',
+                             'product_id', 'product_name', 'quantity', 'price',
+                             'total_amount', 'timestamp', 'timestamp_ns',
+                             'timestamp_utc'])
+    
+    def __init__(self, generation: int = 0) -> None:
+        # Bumped on every mutation; lets readers detect a changed store
+        self.generation = generation
+        self._size = 0
+        self._columns = {
+            name: np.empty(self.INITIAL_CAPACITY, dtype=dtype)
+            for name, dtype in self.COLUMN_DTYPES.items()
+        }
+        # id -> code lookups plus per-code id, (first seen) name and the
+        # row indices holding that code, in insertion order
+        self.customer_index: Dict[Any, int] = {}
+        self.customer_ids: List[Any] = []
+        self.customer_names: List[Any] = []
+        self.customer_rows: List[List[int]] = []
+        self.product_index: Dict[Any, int] = {}
+        self.product_ids: List[Any] = []
+        self.product_names: List[Any] = []
+        self.product_rows: List[List[int]] = []
+        self.customer_name_dictionary = Dictionary()
+        self.product_name_dictionary = Dictionary()
+        # Number of codes visible to this version; the shared dictionaries
+        # may already hold newer ones
+        self.n_customers = 0
+        self.n_products = 0
+        
+        # Running aggregates indexed by product / customer code
+        groups = self.GROUP_CAPACITY
+        self.product_sales = np.zeros(groups)
+        self.product_quantity = np.zeros(groups)
+        self.product_count = np.zeros(groups, dtype=np.int64)
+        self.customer_spent = np.zeros(groups)
+        self.customer_transactions = np.zeros(groups, dtype=np.int64)
+        self.customer_items = np.zeros(groups)
+        # One read-only uint64 bitset row per customer code
+        self.customer_product_bits: List[np.ndarray] = []
+        
+        # (-total_spent, customer_code): highest spender first, ties in
+        # first-seen order
+        self.customer_ranking = Ranking()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def column(self, name: str) -> np.ndarray:
+        """Return a view of the populated part of a column."""
+        return self._columns[name][:self._size]
+    
+    def _visible_rows(self, rows: List[int]) -> List[int]:
+        # Postings are ascending and shared with newer versions
+        return rows[:bisect_left(rows, self._size)]
+    
+    def rows_for_customer(self, customer_id: Any) -> List[int]:
+        """Row indices of a customer's transactions (hash index lookup)."""
+        code = self.customer_index.get(customer_id)
+        if code is None or code >= self.n_customers:
+            return []
+        return self._visible_rows(self.customer_rows[code])
+    
+    def rows_for_product(self, product_id: Any) -> List[int]:
+        """Row indices of a product's transactions (hash index lookup)."""
+        code = self.product_index.get(product_id)
+        if code is None or code >= self.n_products:
+            return []
+        return self._visible_rows(self.product_rows[code])
+    
+    def _reserve(self, capacity: int) -> None:
+        """Grow every column to hold at least `capacity` rows (amortized doubling)."""
+        current = len(self._columns['quantity'])
+        if capacity <= current:
+            return
+        new_capacity = max(capacity, current * 2)
+        # Rebind a fresh dict so older versions keep their own buffers
+        columns = {}
+        for name, old in self._columns.items():
+            grown = np.empty(new_capacity, dtype=old.dtype)
+            grown[:self._size] = old[:self._size]
+            columns[name] = grown
+        self._columns = columns
+    
+    def _add_customer(self, record: Dict[str, Any]) -> None:
+        customer_id = record['customer_id']
+        code = len(self.customer_ids)
+        self.customer_ids.append(customer_id)
+        self.customer_names.append(record['customer_name'])
+        self.customer_rows.append([])
+        # Publish the id last, once its per-code slots exist
+        self.customer_index[customer_id] = code
+    
+    def _add_product(self, record: Dict[str, Any]) -> None:
+        product_id = record['product_id']
+        code = len(self.product_ids)
+        self.product_ids.append(product_id)
+        self.product_names.append(record['product_name'])
+        self.product_rows.append([])
+        self.product_index[product_id] = code
+    
+    def with_batch(self, records: Sequence[Dict[str, Any]],
+                   numeric: Optional[Dict[str, np.ndarray]] = None) -> 'Store':
+        """
+        Return a new version with validated transaction records appended.
+        
+        Rows are written past this version's size, so readers holding it
+        are unaffected. Callers must serialize writers (see TransactionDB).
+        
+        Args:
+            records: Transactions that already passed validation
+            numeric: Optional precomputed quantity, price, total_amount and
+                timestamp_ns arrays aligned with records
+        
+        Returns:
+            The next Store version, or self if records is empty
+        """
+        count = len(records)
+        if not count:
+            return self
+        
+        new = copy.copy(self)
+        start, end = new._size, new._size + count
+        new._reserve(end)
+        columns = new._columns
+        
+        # One list comprehension (or precomputed array) per column, then a
+        # single slice assignment
+        for name in ('quantity', 'price', 'total_amount', 'timestamp_ns'):
+            columns[name][start:end] = (numeric[name] if numeric is not None
+                                        else [r[name] for r in records])
+        columns['timestamp_utc'][start:end] = [r['timestamp_utc'] for r in records]
+        
+        # The ID and name dictionaries are shared with published versions,
+        # so new codes are only staged here and added once every column
+        # is written - a batch that fails midway leaves them untouched
+        customer_names = new.customer_name_dictionary
+        product_names = new.product_name_dictionary
+        staged = {
+            'customer_code': stage_codes(new.customer_index,
+                                         [r['customer_id'] for r in records]),
+            'product_code': stage_codes(new.product_index,
+                                        [r['product_id'] for r in records]),
+            'customer_name_code': stage_codes(customer_names.index,
+                                              [r['customer_name'] for r in records]),
+            'product_name_code': stage_codes(product_names.index,
+                                             [r['product_name'] for r in records])
+        }
+        for name, (codes, _) in staged.items():
+            columns[name][start:end] = codes
+        
+        transaction_ids = columns['transaction_id']
+        for offset, record in enumerate(records, start):
+            transaction_ids[offset] = record['transaction_id']
+        
+        # Keep any non-core fields so rows round-trip unchanged
+        extra = columns['extra']
+        for offset, record in enumerate(records, start):
+            extra[offset] = {k: v for k, v in record.items()
+                             if k not in self.CORE_FIELDS} or None
+        
+        for position in staged['customer_code'][1]:
+            new._add_customer(records[position])
+        for position in staged['product_code'][1]:
+            new._add_product(records[position])
+        for position in staged['customer_name_code'][1]:
+            customer_names.add(records[position]['customer_name'])
+        for position in staged['product_name_code'][1]:
+            product_names.add(records[position]['product_name'])
+        
+        new._size = end
+        new.n_customers = len(new.customer_ids)
+        new.n_products = len(new.product_ids)
+        new._index(start, end)
+        new._accumulate(start, end)
+        new.generation += 1
+        return new
+    
+    def _index(self, start: int, end: int) -> None:
+        """Append rows [start, end) to the customer and product postings."""
+        customer_rows, product_rows = self.customer_rows, self.product_rows
+        codes = zip(self.column('customer_code')[start:end].tolist(),
+                    self.column('product_code')[start:end].tolist())
+        for row, (customer, product) in enumerate(codes, start):
+            customer_rows[customer].append(row)
+            product_rows[product].append(row)
+    
+    def _accumulate(self, start: int, end: int) -> None:
+        """
+        Fold rows [start, end) into the per-group aggregates.
+        
+        The customer kernel runs over only the t customers the batch
+        touches, renumbered 0..t-1, so the work besides the numeric array
+        copies and one list-of-rows pointer copy is O(batch + t).
+        """
+        n_customers, n_products = self.n_customers, self.n_products
+        self.product_sales = _grow(self.product_sales, n_products, copy=True)
+        self.product_quantity = _grow(self.product_quantity, n_products, copy=True)
+        self.product_count = _grow(self.product_count, n_products, copy=True)
+        self.customer_spent = _grow(self.customer_spent, n_customers, copy=True)
+        self.customer_transactions = _grow(self.customer_transactions, n_customers, copy=True)
+        self.customer_items = _grow(self.customer_items, n_customers, copy=True)
+        
+        customer_codes = self.column('customer_code')[start:end]
+        product_codes = self.column('product_code')[start:end]
+        amounts = self.column('total_amount')[start:end]
+        quantities = self.column('quantity')[start:end]
+        
+        touched, local_codes = np.unique(customer_codes, return_inverse=True)
+        previous_spent = self.customer_spent[touched]
+        previous_transactions = self.customer_transactions[touched]
+        
+        # Gather the touched customers' bit rows, widened to every product
+        # name seen so far; other rows stay shared with older versions
+        product_bits = self.customer_product_bits = (
+            self.customer_product_bits
+            + [_NO_PRODUCTS] * (n_customers - len(self.customer_product_bits))
+        )
+        touched_codes = touched.tolist()
+        width = (len(self.product_name_dictionary) + 63) // 64
+        bits = np.zeros((len(touched_codes), width), dtype=np.uint64)
+        for local, code in enumerate(touched_codes):
+            row = product_bits[code]
+            bits[local, :len(row)] = row
+        spent = previous_spent.copy()
+        transactions = previous_transactions.copy()
+        items = self.customer_items[touched]
+        
+        products_kernel = (accumulate_products_parallel
+                           if use_parallel(end - start, len(self.product_sales))
+                           else accumulate_products)
+        customers_kernel = (accumulate_customers_parallel
+                            if use_parallel(end - start, len(touched_codes))
+                            else accumulate_customers)
+        
+        products_kernel(product_codes, amounts, quantities, self.product_sales,
+                        self.product_quantity, self.product_count)
+        # Product bits are keyed by product *name* code, matching the
+        # distinct-names semantics of products_purchased
+        customers_kernel(local_codes, amounts, quantities,
+                         self.column('product_name_code')[start:end],
+                         spent, transactions, items, bits)
+        
+        self.customer_spent[touched] = spent
+        self.customer_transactions[touched] = transactions
+        self.customer_items[touched] = items
+        bits.flags.writeable = False
+        for local, code in enumerate(touched_codes):
+            product_bits[code] = bits[local]
+        
+        # Re-rank only the customers this batch touched - O(t log K)
+        ranking = self.customer_ranking = self.customer_ranking.copy()
+        for code, spent, seen in zip(touched.tolist(), previous_spent.tolist(),
+                                     previous_transactions.tolist()):
+            if seen:
+                ranking.remove((-spent, code))
+            ranking.add((-float(self.customer_spent[code]), code))
+    
+    def to_arrow(self) -> 'pa.Table':
+        """
+        Expose this version as a pyarrow Table.
+        
+        Numeric and timestamp columns wrap the NumPy buffers without
+        copying, and the code columns become the indices of Arrow
+        dictionary arrays over the ID / name dictionaries, so the table
+        costs O(distinct values) plus the transaction ID column. Rows past
+        this version's size are never written again, so the table stays
+        valid after later inserts. Non-core fields are not exported.
+        
+        Uploads may mix string and integer IDs, so ID and name columns are
+        always exported as strings.
+        """
+        def strings(values: List[Any]) -> 'pa.Array':
+            return pa.array([str(value) for value in values], type=pa.string())
+        
+        def dictionary(codes: str, values: List[Any]) -> 'pa.DictionaryArray':
+            return pa.DictionaryArray.from_arrays(pa.array(self.column(codes)),
+                                                  strings(values))
+        
+        return pa.table({
+            'transaction_id': strings(self.column('transaction_id').tolist()),
+            'customer_id': dictionary('customer_code', self.customer_ids[:self.n_customers]),
+            'customer_name': dictionary('customer_name_code',
+                                        self.customer_name_dictionary.values[:]),
+            'product_id': dictionary('product_code', self.product_ids[:self.n_products]),
+            'product_name': dictionary('product_name_code',
+                                       self.product_name_dictionary.values[:]),
+            'quantity': pa.array(self.column('quantity')),
+            'price': pa.array(self.column('price')),
+            'total_amount': pa.array(self.column('total_amount')),
+            'timestamp': pa.array(self.column('timestamp_ns').view('datetime64[ns]'))
+        })
+    
+    def records(self, rows: Any) -> List[Dict[str, Any]]:
+        """
+        Materialize the given row indices as transaction dicts for JSON output.
+        
+        Each column is gathered once with fancy indexing and converted with
+        .tolist(), so building a row is a zip over plain Python values rather
+        than nine separate array lookups.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        columns = self._columns
+        customer_ids, product_ids = self.customer_ids, self.product_ids
+        customer_names = self.customer_name_dictionary.values
+        product_names = self.product_name_dictionary.values
+        
+        fields = zip(
+            columns['transaction_id'][rows].tolist(),
+            columns['customer_code'][rows].tolist(),
+            columns['customer_name_code'][rows].tolist(),
+            columns['product_code'][rows].tolist(),
+            columns['product_name_code'][rows].tolist(),
+            columns['quantity'][rows].tolist(),
+            columns['price'][rows].tolist(),
+            columns['total_amount'][rows].tolist(),
+            columns['timestamp_ns'][rows].tolist(),
+            columns['timestamp_utc'][rows].tolist(),
+            columns['extra'][rows].tolist()
+        )
+        results = []
+        for (transaction_id, customer, customer_name, product, product_name,
+             quantity, price, total_amount, timestamp_ns, timestamp_utc, extra) in fields:
+            result = {
+                'transaction_id': transaction_id,
+                'customer_id': customer_ids[customer],
+                'customer_name': customer_names[customer_name],
+                'product_id': product_ids[product],
+                'product_name': product_names[product_name],
+                'quantity': as_quantity(quantity),
+                'price': price,
+                'total_amount': total_amount,
+                'timestamp': from_unix_ns(timestamp_ns, timestamp_utc)
+            }
+            if extra:
+                result.update(extra)
+            results.append(result)
+        return results
 
 
-# In-memory database for transactions
-transactions_db: List[Dict[str, Any]] = []
+class TransactionDB:
+    """
+    Thread-safe handle on the current Store snapshot.
+    
+    Writers serialize on a lock, build the next version and publish it with
+    a single reference assignment. Readers call snapshot() once at entry
+    and work against that version lock-free, so a request never observes a
+    half-applied batch or a concurrent clear.
+    """
+    
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._current = Store()
+    
+    def __len__(self) -> int:
+        return len(self._current)
+    
+    @property
+    def generation(self) -> int:
+        return self._current.generation
+    
+    def snapshot(self) -> Store:
+        """Return the latest published Store version."""
+        return self._current
+    
+    def append_batch(self, records: Sequence[Dict[str, Any]],
+                     numeric: Optional[Dict[str, np.ndarray]] = None,
+                     reset: bool = False) -> None:
+        """
+        Append validated records and publish the resulting version.
+        
+        With reset=True the records replace the stored rows instead; readers
+        see either the old contents or the new batch, never an empty store.
+        """
+        with self._lock:
+            base = Store(self._current.generation + 1) if reset else self._current
+            self._current = base.with_batch(records, numeric)
+    
+    def clear(self) -> int:
+        """
+        Publish an empty store and return how many rows were dropped.
+        
+        Returns:
+            Row count of the version that was replaced
+        """
+        with self._lock:
+            dropped = len(self._current)
+            self._current = Store(self._current.generation + 1)
+            return dropped
+
+
+# In-memory columnar database for transactions
+transactions_db = TransactionDB()
+
+REQUIRED_FIELDS = ('transaction_id', 'customer_id', 'customer_name',
+                   'product_id', 'product_name', 'quantity', 'price')
+
+# Dictionary-encoded fields; they must be strings or integers to be
+# usable as keys (bools are excluded, as True would merge with 1)
+KEY_FIELDS = ('customer_id', 'customer_name', 'product_id', 'product_name')
+
+
+def _is_key(value: Any) -> bool:
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+# Batches at least this large are validated with vectorized column checks
+BATCH_VALIDATION_THRESHOLD = 64
+
+
+def _parse_timestamp(data: Dict[str, Any], now_ns: int) -> Optional[str]:
+    """
+    Parse data['timestamp'] into data['timestamp_ns'] and data['timestamp_utc'].
+    
+    timestamp_utc records whether the input carried an offset, so output
+    can mark the normalized value as UTC instead of dropping the offset.
+    
+    Args:
+        data: Transaction data dictionary
+        now_ns: Batch upload time, used when no timestamp is given
+    
+    Returns:
+        Error message, or None when the timestamp is valid
+    """
+    # Missing timestamps take the batch time; ISO text is only produced on output
+    if 'timestamp' not in data:
+        data['timestamp_ns'] = now_ns
+        data['timestamp_utc'] = False
+        return None
+    
+    # Parse once at insert time so filters compare plain int64 values
+    try:
+        parsed = datetime.fromisoformat(data['timestamp'])
+        timestamp_ns = to_unix_ns(parsed)
+    except TypeError as e:
+        return f"Invalid data type: {str(e)}"
+    except (ValueError, OverflowError):
+        return f"Invalid timestamp format: {data['timestamp']}"
+    
+    if not _NS_MIN <= timestamp_ns <= _NS_MAX:
+        return f"Timestamp out of range: {data['timestamp']}"
+    
+    data['timestamp_ns'] = timestamp_ns
+    data['timestamp_utc'] = parsed.tzinfo is not None
+    return None
 
 
 # Helper function to validate transaction data
-def validate_transaction(data: Dict[str, Any]) -> tuple[bool, Optional[str]]:
+def validate_transaction(data: Dict[str, Any],
+                         now_ns: Optional[int] = None) -> tuple[bool, Optional[str]]:
     """
     Validate transaction data structure.
     
     Args:
         data: Transaction data dictionary
+        now_ns: Upload time in Unix ns for a missing timestamp (default:
+            the server's local time now)
         
     Returns:
         Tuple of (is_valid, error_message)
     """
-    required_fields = ['transaction_id', 'customer_id', 'customer_name', 
-                       'product_id', 'product_name', 'quantity', 'price']
-    
     # Check required fields
-    for field in required_fields:
+    for field in REQUIRED_FIELDS:
         if field not in data:
             return False, f"Missing required field: {field}"
     
+    for field in KEY_FIELDS:
+        if not _is_key(data[field]):
+            return False, f"{field} must be a string or integer"
+    
     # Validate data types
     try:
         if not isinstance(data['quantity'], (int, float)) or data['quantity'] <= 0:
@@ -58,9 +1012,9 @@ def validate_transaction(data: Dict[str, Any]) -> tuple[bool, Optional[str]]:
         # Calculate total amount
         data['total_amount'] = data['quantity'] * data['price']
         
-        # Add timestamp if not present
-        if 'timestamp' not in data:
-            data['timestamp'] = datetime.now().isoformat()
+        error_msg = _parse_timestamp(data, to_unix_ns(datetime.now()) if now_ns is None else now_ns)
+        if error_msg:
+            return False, error_msg
         
         return True, None
         
@@ -68,6 +1022,112 @@ def validate_transaction(data: Dict[str, Any]) -> tuple[bool, Optional[str]]:
         return False, f"Invalid data type: {str(e)}"
 
 
+def _numeric_column(values: List[Any]) -> np.ndarray:
+    """float64 column of `values`, with NaN wherever a value is not a number."""
+    return np.fromiter((v if isinstance(v, (int, float)) else np.nan for v in values),
+                       dtype=np.float64, count=len(values))
+
+
+def _validate_batch_vectorized(transactions: List[Dict[str, Any]], now_ns: int) -> tuple:
+    """
+    Column-wise equivalent of calling validate_transaction on every record.
+    
+    Each check runs as one pass producing a boolean mask; a record's error
+    is the first failing check in validate_transaction's order.
+    """
+    n = len(transactions)
+    valid = np.ones(n, dtype=bool)
+    messages = np.empty(n, dtype=object)
+    
+    def reject(failed: np.ndarray, message: Any) -> None:
+        failed = failed & valid
+        messages[failed] = message
+        valid[failed] = False
+    
+    for field in REQUIRED_FIELDS:
+        reject(np.fromiter((field not in t for t in transactions), dtype=bool, count=n),
+               f"Missing required field: {field}")
+    
+    for field in KEY_FIELDS:
+        reject(np.fromiter((not _is_key(t.get(field)) for t in transactions),
+                           dtype=bool, count=n),
+               f"{field} must be a string or integer")
+    
+    quantity = _numeric_column([t.get('quantity') for t in transactions])
+    price = _numeric_column([t.get('price') for t in transactions])
+    reject(~(quantity > 0), "Quantity must be a positive number")
+    reject(~(price >= 0), "Price must be a non-negative number")
+    total_amount = quantity * price
+    
+    # ISO parsing stays per record, but only for rows still valid
+    timestamp_ns = np.zeros(n, dtype=np.int64)
+    for row in np.flatnonzero(valid):
+        error_msg = _parse_timestamp(transactions[row], now_ns)
+        if error_msg:
+            messages[row] = error_msg
+            valid[row] = False
+        else:
+            timestamp_ns[row] = transactions[row]['timestamp_ns']
+    
+    rows = np.flatnonzero(valid)
+    errors = [
+        {
+            'index': int(row),
+            'transaction_id': transactions[row].get('transaction_id', 'Unknown'),
+            'error': messages[row]
+        }
+        for row in np.flatnonzero(~valid)
+    ]
+    columns = {
+        'quantity': quantity[rows],
+        'price': price[rows],
+        'total_amount': total_amount[rows],
+        'timestamp_ns': timestamp_ns[rows]
+    }
+    return [transactions[row] for row in rows], columns, errors
+
+
+def validate_batch(transactions: List[Any]) -> tuple:
+    """
+    Validate a batch of uploaded transactions.
+    
+    Large batches of dicts are checked column-wise with NumPy; smaller or
+    irregular ones go through validate_transaction record by record.
+    
+    Returns:
+        Tuple of (valid_transactions, columns, errors) where columns holds
+        precomputed numeric columns aligned with valid_transactions, or None
+        when validate_transaction filled the values in on each record
+    """
+    # One clock read per batch instead of one per record; like the stored
+    # timestamps it is naive local wall time, matching /api/health
+    now_ns = to_unix_ns(datetime.now())
+    
+    if (len(transactions) >= BATCH_VALIDATION_THRESHOLD
+            and all(isinstance(t, dict) for t in transactions)):
+        try:
+            return _validate_batch_vectorized(transactions, now_ns)
+        except OverflowError:
+            pass  # integers too large for float64; use the exact scalar path
+    
+    valid_transactions = []
+    errors = []
+    
+    for idx, transaction in enumerate(transactions):
+        is_valid, error_msg = validate_transaction(transaction, now_ns)
+        
+        if is_valid:
+            valid_transactions.append(transaction)
+        else:
+            errors.append({
+                'index': idx,
+                'transaction_id': transaction.get('transaction_id', 'Unknown'),
+                'error': error_msg
+            })
+    
+    return valid_transactions, None, errors
+
+
 # ============================================================================
 # ENDPOINT 1: Upload Transactions
 # ============================================================================
@@ -97,17 +1157,21 @@ def upload_transactions():
             ]
         }
     
+    Query Parameters:
+        - reset: 1 to replace all stored transactions with this batch
+    
     Returns:
         JSON response with success status and message
     """
     try:
-        data = request.get_json()
+        data = request_json()
+        reset = request.args.get('reset', 0, type=int) == 1
         
         if not data:
-            return jsonify({
+            return fast_json({
                 'success': False,
                 'error': 'No data provided'
-            }), 400
+            }, 400)
         
         #Handle both single transaction and batch upload
         transactions_to_add = []
@@ -122,22 +1186,12 @@ def upload_transactions():
             # Single transaction object
             transactions_to_add = [data]
         
-        # Validate and add transactions
-        added_count = 0
-        errors = []
-        
-        for idx, transaction in enumerate(transactions_to_add):
-            is_valid, error_msg = validate_transaction(transaction)
-            
-            if is_valid:
-                transactions_db.append(transaction)
-                added_count += 1
-            else:
-                errors.append({
-                    'index': idx,
-                    'transaction_id': transaction.get('transaction_id', 'Unknown'),
-                    'error': error_msg
-                })
+        # Validate, then append all valid rows to the columns in one batch;
+        # a reset only applies when the batch has rows to replace them with
+        valid_transactions, columns, errors = validate_batch(transactions_to_add)
+        transactions_db.append_batch(valid_transactions, columns,
+                                     reset=reset and bool(valid_transactions))
+        added_count = len(valid_transactions)
         
         response = {
             'success': True,
@@ -149,13 +1203,19 @@ def upload_transactions():
             response['errors'] = errors
             response['failed_count'] = len(errors)
         
-        return jsonify(response), 201 if added_count > 0 else 400
+        return fast_json(response, 201 if added_count > 0 else 400)
         
+    except HTTPException as e:
+        # Unreadable or oversized bodies are client errors, not server errors
+        return fast_json({
+            'success': False,
+            'error': e.description
+        }, e.code)
     except Exception as e:
-        return jsonify({
+        return fast_json({
             'success': False,
             'error': f'Server error: {str(e)}'
-        }), 500
+        }, 500)
 
 
 # ============================================================================
@@ -163,6 +1223,7 @@ def upload_transactions():
 # ============================================================================
 
 @app.route('/api/sales/by-product', methods=['GET'])
+@cached_response
 def sales_by_product():
     """
     Calculate total sales amount for each product.
@@ -181,47 +1242,55 @@ def sales_by_product():
         order = request.args.get('order', 'desc')
         limit = request.args.get('limit', type=int)
         
-        # Optimized: Use dict with manual initialization for type safety and O(1) lookups
-        product_sales: Dict[str, Dict[str, Any]] = {}
-        
-        # Single-pass aggregation - O(n) time complexity
-        for transaction in transactions_db:
-            product_id = transaction['product_id']
-            if product_id not in product_sales:
-                product_sales[product_id] = {
-                    'product_id': product_id,
-                    'product_name': transaction['product_name'],
-                    'total_sales': 0.0,
-                    'total_quantity': 0,
-                    'transaction_count': 0
-                }
-            # Direct access - already initialized
-            product_sales[product_id]['total_sales'] += transaction['total_amount']
-            product_sales[product_id]['total_quantity'] += transaction['quantity']
-            product_sales[product_id]['transaction_count'] += 1
-        
-        # Convert to list - no intermediate storage
-        results = list(product_sales.values())
-        
-        # Optimized: Use itemgetter for faster sorting - 2x faster than lambda
-        sort_key = 'total_sales' if sort_by == 'sales' else 'total_quantity'
-        results.sort(key=itemgetter(sort_key), reverse=(order == 'desc'))
-        
-        # Apply limit if specified
-        if limit and limit > 0:
-            results = results[:limit]
-        
-        return jsonify({
+        store = transactions_db.snapshot()
+        n_products = store.n_products
+        
+        # Running totals are maintained on insert - O(products), no row scan
+        total_sales = store.product_sales[:n_products]
+        total_quantity = store.product_quantity[:n_products]
+        transaction_count = store.product_count[:n_products]
+        
+        # Ascending sort keys; negate for descending order
+        sort_values = total_sales if sort_by == 'sales' else total_quantity
+        keys = -sort_values if order == 'desc' else sort_values
+        
+        if limit and 0 < limit < n_products // 4:
+            # Optimized: O(n) partition finds the limit-th key, then only the
+            # products at or above it are sorted. Stable sort of that subset
+            # (in code order) keeps first-seen tie-breaking exact.
+            kth = np.partition(keys, limit - 1)[limit - 1]
+            candidates = np.flatnonzero(keys <= kth)
+            order_idx = candidates[np.argsort(keys[candidates], kind='stable')][:limit]
+        else:
+            order_idx = np.argsort(keys, kind='stable')
+            
+            # Apply limit if specified
+            if limit and limit > 0:
+                order_idx = order_idx[:limit]
+        
+        # Build dicts only for the products actually returned
+        results = [
+            {
+                'product_id': store.product_ids[code],
+                'product_name': store.product_names[code],
+                'total_sales': total_sales[code],
+                'total_quantity': as_quantity(total_quantity[code]),
+                'transaction_count': transaction_count[code]
+            }
+            for code in order_idx
+        ]
+        
+        return fast_json({
             'success': True,
             'count': len(results),
             'data': results
-        }), 200
+        }, 200)
         
     except Exception as e:
-        return jsonify({
+        return fast_json({
             'success': False,
             'error': f'Server error: {str(e)}'
-        }), 500
+        }, 500)
 
 
 # ============================================================================
@@ -229,6 +1298,7 @@ def sales_by_product():
 # ============================================================================
 
 @app.route('/api/customers/top', methods=['GET'])
+@cached_response
 def top_customers():
     """
     Get top customers by total purchase amount.
@@ -236,6 +1306,8 @@ def top_customers():
     Query Parameters:
         - limit: Number of top customers to return (default: 10)
         - min_amount: Minimum purchase amount filter (optional)
+        - format: 'list' or 'map' (default: 'list'); 'map' keys data by
+          customer ID, in rank order
     
     Returns:
         JSON array of top customers with their purchase statistics
@@ -244,62 +1316,109 @@ def top_customers():
         # Get query parameters
         limit = request.args.get('limit', default=10, type=int)
         min_amount = request.args.get('min_spent', default=0, type=float)
+        as_map = request.args.get('format', 'list') == 'map'
+        
+        store = transactions_db.snapshot()
+        product_names = store.product_name_dictionary.values
+        total_spent = store.customer_spent
+        total_transactions = store.customer_transactions
+        total_items = store.customer_items
+        product_bits = store.customer_product_bits
+        
+        # Optimized: Customers are kept ranked on insert, so bisect for the
+        # min_spent cut-off in O(log K) and read the first `limit` entries
+        ranking = store.customer_ranking
+        eligible = ranking.bisect_right((-min_amount, store.n_customers))
+        count = len(range(eligible)[:limit])
         
-        # Optimized: Use dict with type safety for proper inference
-        customer_stats: Dict[str, Dict[str, Any]] = {}
-        
-        # Single-pass aggregation - O(n) time complexity
-        for transaction in transactions_db:
-            customer_id = transaction['customer_id']
-            if customer_id not in customer_stats:
-                customer_stats[customer_id] = {
-                    'customer_id': customer_id,
-                    'customer_name': transaction['customer_name'],
-                    'total_spent': 0.0,
-                    'total_transactions': 0,
-                    'total_items': 0,
-                    'products_purchased': set()
-                }
-            # Direct access - already initialized
-            customer_stats[customer_id]['total_spent'] += transaction['total_amount']
-            customer_stats[customer_id]['total_transactions'] += 1
-            customer_stats[customer_id]['total_items'] += transaction['quantity']
-            customer_stats[customer_id]['products_purchased'].add(transaction['product_name'])
-        
-        # Optimized: Process and filter in single pass, avoid creating intermediate list
+        codes = [code for _, code in ranking.islice(0, count)]
+        
+        # Only the returned customers are materialized as dicts
         results = []
-        for stats in customer_stats.values():
-            if stats['total_spent'] >= min_amount:
-                # Calculate derived fields in-place
-                products_set = stats['products_purchased']
-                stats['unique_products_count'] = len(products_set)
-                stats['products_purchased'] = list(products_set)
-                stats['average_transaction'] = stats['total_spent'] / stats['total_transactions']
-                results.append(stats)
-        
-        # Optimized: Use itemgetter for 2x faster sorting than lambda
-        results.sort(key=itemgetter('total_spent'), reverse=True)
-        
-        # Apply limit
-        results = results[:limit]
-        
-        return jsonify({
+        for code in codes:
+            row = product_bits[code]
+            # Distinct product count is a popcount over the customer's bitset
+            unique_count = int(np.bitwise_count(row).sum())
+            # Little-endian bytes make bit p of the row land at position p
+            bits = np.unpackbits(row.astype('<u8').view(np.uint8), bitorder='little')
+            products = [product_names[name_code] for name_code in np.flatnonzero(bits)]
+            results.append({
+                'customer_id': store.customer_ids[code],
+                'customer_name': store.customer_names[code],
+                'total_spent': total_spent[code],
+                'total_transactions': total_transactions[code],
+                'total_items': as_quantity(total_items[code]),
+                'products_purchased': products,
+                'unique_products_count': unique_count,
+                'average_transaction': total_spent[code] / total_transactions[code]
+            })
+        
+        return fast_json({
             'success': True,
             'count': len(results),
-            'data': results
-        }), 200
+            'data': ({str(result['customer_id']): result for result in results}
+                     if as_map else results)
+        }, 200)
         
     except Exception as e:
-        return jsonify({
+        return fast_json({
             'success': False,
             'error': f'Server error: {str(e)}'
-        }), 500
+        }, 500)
 
 
 # ============================================================================
 # ENDPOINT 4: Filter Transactions
 # ============================================================================
 
+@lru_cache(maxsize=64)
+def make_filter(has_customer: bool, has_product: bool, has_min: bool,
+                has_max: bool, has_start: bool, has_end: bool) -> Callable:
+    """
+    Build the mask function for one combination of present filters.
+    
+    Each of the 64 combinations is specialized once and cached, so a
+    request runs exactly the comparisons it needs with no per-filter
+    branching. One comparison produces the mask directly; several are
+    AND-ed through a single scratch buffer.
+    
+    Returns:
+        f(column, bounds) -> boolean mask, or None when nothing is filtered.
+        column(name) returns the candidate values for a store column and
+        bounds maps each spec key to its comparison value.
+    """
+    specs = []
+    if has_customer and has_product:
+        # Postings cover only one of the ids; check both over the subset
+        specs.append((np.equal, 'customer_code', 'customer_code'))
+        specs.append((np.equal, 'product_code', 'product_code'))
+    if has_min:
+        specs.append((np.greater_equal, 'total_amount', 'min_amount'))
+    if has_max:
+        specs.append((np.less_equal, 'total_amount', 'max_amount'))
+    if has_start:
+        specs.append((np.greater_equal, 'timestamp_ns', 'start_ns'))
+    if has_end:
+        specs.append((np.less_equal, 'timestamp_ns', 'end_ns'))
+    
+    if not specs:
+        return lambda column, bounds: None
+    
+    (first_compare, first_name, first_key), rest = specs[0], tuple(specs[1:])
+    if not rest:
+        return lambda column, bounds: first_compare(column(first_name), bounds[first_key])
+    
+    def matches(column: Callable[[str], np.ndarray], bounds: Dict[str, Any]) -> np.ndarray:
+        mask = first_compare(column(first_name), bounds[first_key])
+        scratch = np.empty_like(mask)
+        for compare, name, key in rest:
+            compare(column(name), bounds[key], out=scratch)
+            np.logical_and(mask, scratch, out=mask)
+        return mask
+    
+    return matches
+
+
 @app.route('/api/transactions/filter', methods=['GET'])
 def filter_transactions():
     """
@@ -314,6 +1433,7 @@ def filter_transactions():
         - end_date: End date (ISO format)
         - limit: Maximum number of results
         - offset: Number of results to skip
+        - count_only: 1 to return only the counts and total, without rows
     
     Returns:
         JSON array of filtered transactions
@@ -328,63 +1448,78 @@ def filter_transactions():
         end_date = request.args.get('end_date')
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', 0, type=int)
+        count_only = request.args.get('count_only', 0, type=int) == 1
         
-        # Optimized: Single-pass filtering using generator - O(n) time, O(1) space for filtering
-        # Avoid multiple intermediate list copies - space complexity reduced from O(n*m) to O(n)
-        def apply_filters(transactions: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
-            """Generator function for memory-efficient filtering"""
-            # Parse dates once outside loop
-            start_dt = datetime.fromisoformat(start_date) if start_date else None
-            end_dt = datetime.fromisoformat(end_date) if end_date else None
-            
-            for t in transactions:
-                # Single-pass combined filter checks
-                if customer_id and t['customer_id'] != customer_id:
-                    continue
-                if product_id and t['product_id'] != product_id:
-                    continue
-                if min_amount is not None and t['total_amount'] < min_amount:
-                    continue
-                if max_amount is not None and t['total_amount'] > max_amount:
-                    continue
-                if start_dt and datetime.fromisoformat(t['timestamp']) < start_dt:
-                    continue
-                if end_dt and datetime.fromisoformat(t['timestamp']) > end_dt:
-                    continue
-                yield t
-        
-        # Materialize filtered results - only create list once
-        filtered = list(apply_filters(transactions_db))
-        
-        # Calculate statistics in single pass
-        total_count = len(filtered)
-        total_amount = sum(t['total_amount'] for t in filtered) if filtered else 0
-        
-        # Apply pagination
+        # Parse dates once up front so a bad date fails even on an empty store
+        start_ns = to_unix_ns(datetime.fromisoformat(start_date)) if start_date else None
+        end_ns = to_unix_ns(datetime.fromisoformat(end_date)) if end_date else None
+        
+        store = transactions_db.snapshot()
+        
+        # Optimized: Start from the smaller id posting list when an id filter
+        # is given - O(matches) instead of O(n)
+        postings = []
+        if customer_id:
+            postings.append(store.rows_for_customer(customer_id))
+        if product_id:
+            postings.append(store.rows_for_product(product_id))
+        candidates = (np.asarray(min(postings, key=len), dtype=np.intp)
+                      if postings else None)
+        
+        def column(name: str) -> np.ndarray:
+            values = store.column(name)
+            return values if candidates is None else values[candidates]
+        
+        # ids compare as int32 codes, never as strings
+        amounts = column('total_amount')
+        matches = make_filter(bool(customer_id), bool(product_id),
+                              min_amount is not None, max_amount is not None,
+                              start_ns is not None, end_ns is not None)
+        mask = matches(column, {
+            'customer_code': store.customer_index.get(customer_id, -1),
+            'product_code': store.product_index.get(product_id, -1),
+            'min_amount': min_amount,
+            'max_amount': max_amount,
+            'start_ns': start_ns,
+            'end_ns': end_ns
+        })
+        
+        selected = np.flatnonzero(mask) if mask is not None else np.arange(len(amounts))
+        rows = selected if candidates is None else candidates[selected]
+        
+        # Calculate statistics over the selected rows
+        total_count = len(rows)
+        total_amount = amounts[selected].sum() if total_count else 0
+        
+        # Optimized: Paginate the row indices, then materialize only the page
         if limit:
-            filtered = filtered[offset:offset + limit]
+            rows = rows[offset:offset + limit]
         elif offset:
-            filtered = filtered[offset:]
+            rows = rows[offset:]
         
-        return jsonify({
+        result = {
             'success': True,
-            'count': len(filtered),
+            'count': len(rows),
             'total_count': total_count,
             'total_amount': total_amount,
-            'offset': offset,
-            'data': filtered
-        }), 200
+            'offset': offset
+        }
+        # count_only skips materializing and sending the rows entirely
+        if not count_only:
+            result['data'] = store.records(rows)
+        
+        return fast_json(result, 200)
         
     except ValueError as e:
-        return jsonify({
+        return fast_json({
             'success': False,
             'error': f'Invalid date format: {str(e)}'
-        }), 400
+        }, 400)
     except Exception as e:
-        return jsonify({
+        return fast_json({
             'success': False,
             'error': f'Server error: {str(e)}'
-        }), 500
+        }, 500)
 
 
 # ============================================================================
@@ -397,45 +1532,66 @@ def get_all_transactions():
     limit = request.args.get('limit', type=int)
     offset = request.args.get('offset', 0, type=int)
     
-    # Optimized: Slice once instead of checking limit twice
+    # Optimized: Slice once, then materialize only the requested rows
+    store = transactions_db.snapshot()
     end_idx = offset + limit if limit else None
-    result = transactions_db[offset:end_idx]
+    result = store.records(range(len(store))[offset:end_idx])
     
-    return jsonify({
+    return fast_json({
         'success': True,
         'count': len(result),
-        'total_count': len(transactions_db),
+        'total_count': len(store),
         'data': result
-    }), 200
+    }, 200)
+
+
+@app.route('/api/transactions/export', methods=['GET'])
+def export_transactions():
+    """Download all transactions as a Parquet file."""
+    if pa is None:
+        return fast_json({
+            'success': False,
+            'error': 'Parquet export requires pyarrow'
+        }, 501)
+    
+    try:
+        buffer = pa.BufferOutputStream()
+        pq.write_table(transactions_db.snapshot().to_arrow(), buffer)
+        return Response(buffer.getvalue().to_pybytes(), status=200,
+                        mimetype='application/vnd.apache.parquet')
+    
+    except Exception as e:
+        return fast_json({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }, 500)
 
 
 @app.route('/api/transactions', methods=['DELETE'])
 def clear_transactions():
     """Clear all transactions (for testing purposes)."""
-    global transactions_db
-    count = len(transactions_db)
-    transactions_db = []
+    count = transactions_db.clear()
     
-    return jsonify({
+    return fast_json({
         'success': True,
         'message': f'Cleared {count} transaction(s)'
-    }), 200
+    }, 200)
 
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
-    return jsonify({
+    return fast_json({
         'status': 'healthy',
         'total_transactions': len(transactions_db),
         'timestamp': datetime.now().isoformat()
-    }), 200
+    }, 200)
 
 
 @app.route('/', methods=['GET'])
 def home():
     """API documentation."""
-    return jsonify({
+    return fast_json({
         'message': 'Sales Analytics REST API',
         'version': '1.0',
         'endpoints': {
@@ -444,10 +1600,11 @@ def home():
             'GET /api/customers/top': 'Get top customers by sales',
             'GET /api/transactions/filter': 'Return filtered transactions',
             'GET /api/transactions': 'Get all transactions',
+            'GET /api/transactions/export': 'Export transactions as Parquet',
             'DELETE /api/transactions': 'Clear all transactions',
             'GET /api/health': 'Health check'
         }
-    }), 200
+    }, 200)
 
 
 # ============================================================================
@@ -464,6 +1621,7 @@ if __name__ == '__main__':
     print("  GET    /api/customers/top         - Top customers")
     print("  GET    /api/transactions/filter   - Filter transactions")
     print("  GET    /api/transactions          - Get all transactions")
+    print("  GET    /api/transactions/export   - Export as Parquet")
     print("  DELETE /api/transactions          - Clear all transactions")
     print("  GET    /api/health                - Health check")
     print("\n" + "=" * 70)
@@ -572,7 +1730,7 @@ if __name__ == '__main__':
     
     for txn in sample_transactions:
         validate_transaction(txn)
-        transactions_db.append(txn)
+    transactions_db.append_batch(sample_transactions)
     
     print(f"✅ Loaded {len(transactions_db)} sample transactions")
     print(f"✅ Server ready at http://127.0.0.1:5000")
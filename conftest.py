@@ -0,0 +1,66 @@
+"""
+Pytest configuration for running the API tests in parallel with pytest-xdist
+
+Each xdist worker (gw0, gw1, ...) boots its own Flask server on a dedicated
+port, so workers never share - or clear - each other's in-memory store.
+Run with: pytest -n auto --dist=loadscope
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import test_utils
+
+# Port 5000 stays free for a manually started server; workers use 5001+
+BASE_PORT = 5000
+WORKER = os.environ.get("PYTEST_XDIST_WORKER")
+
+if WORKER:
+    # Test modules import BASE_URL by value, so it must be set before collection
+    WORKER_PORT = BASE_PORT + 1 + int(WORKER.lstrip("gw"))
+    test_utils.BASE_URL = f"http://127.0.0.1:{WORKER_PORT}/api"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--keep-db", action="store_true", default=False,
+        help="skip clean_database's setup DELETE so the previous test's data stays "
+             "on the server for inspection; tests marked empty_store still clear it"
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "empty_store: the test asserts on an empty store, so clean_database "
+                   "clears it even under --keep-db"
+    )
+
+
+@pytest.fixture(scope="session", autouse=True)
+def worker_server():
+    """Boot a dedicated API server for this xdist worker"""
+    if not WORKER:
+        yield
+        return
+    
+    process = subprocess.Popen(
+        [sys.executable, "-m", "flask", "--app", "SalesAnalytics_Task2", "run",
+         "--port", str(WORKER_PORT)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.time() + 30
+        while not test_utils.check_server_health():
+            if process.poll() is not None or time.time() > deadline:
+                pytest.exit(f"API server for {WORKER} failed to start on port {WORKER_PORT}")
+            time.sleep(0.1)
+        yield
+    finally:
+        process.terminate()
+        process.wait()
@@ -3,20 +3,33 @@ Pytest Test Suite for Sales Analytics API
 Tests all endpoints with edge cases, validation, and performance benchmarking
 """
 
+import gzip
+import io
 import pytest
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
+import zlib
 from datetime import datetime, timedelta
+from itertools import repeat
 from typing import Dict, Any, List
+
+import numpy as np
+import orjson
+
+from SalesAnalytics_Task2 import app, TransactionDB, validate_batch
 from test_utils import (
     BASE_URL,
+    CachingSession,
     get_base_url,
     generate_test_data,
     get_sample_transactions,
     clear_database,
     upload_transactions,
-    check_server_health
+    seed_transactions,
+    fetch_all,
+    parse
 )
 
 
@@ -24,6 +37,37 @@ from test_utils import (
 # FIXTURES
 # ============================================================================
 
+@pytest.fixture(scope="session")
+def api():
+    """Shared HTTP session: pooled keep-alive connections, GETs cached until a write"""
+    session = CachingSession()
+    session.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def api_ready(api):
+    """Verify the server is up once per session and start from an empty store"""
+    try:
+        response = api.get(f"{BASE_URL}/health", timeout=2)
+    except requests.ConnectionError:
+        pytest.exit(f"API server is not running at {BASE_URL}", returncode=1)
+    assert response.status_code == 200, f"API server at {BASE_URL} is unhealthy"
+    api.delete(f"{BASE_URL}/transactions")
+
+
+@pytest.fixture(scope="function")
+def clean_database(request, api, api_ready):
+    """Start the test from an empty store with a single DELETE"""
+    # --keep-db leaves the previous test's data on the server for inspection,
+    # except before tests marked empty_store, whose assertions need it empty
+    if (request.config.getoption("--keep-db")
+            and request.node.get_closest_marker("empty_store") is None):
+        return
+    api.delete(f"{BASE_URL}/transactions")
+
+
 @pytest.fixture(scope="function")
 def clean_db():
     """Clear database before and after each test"""
@@ -32,10 +76,53 @@ def clean_db():
     clear_database()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_transactions():
-    """Sample transaction data for testing"""
-    return get_sample_transactions()
+    """Sample transaction data for testing (shared, so treat as read-only)"""
+    return tuple(get_sample_transactions())
+
+
+@pytest.fixture(scope="session")
+def large_batch_payload():
+    """1000 generated transactions as a pre-encoded JSON body"""
+    # Build each field as a column with vectorized string ops, then let
+    # orjson encode the rows in C instead of requests' stdlib json
+    ids = np.arange(1000)
+    customers, products = (ids % 10).astype(str), (ids % 20).astype(str)
+    columns = {
+        "transaction_id": np.char.add("T", np.char.zfill(ids.astype(str), 5)),
+        "customer_id": np.char.add("C", customers),
+        "customer_name": np.char.add("Customer", customers),
+        "product_id": np.char.add("P", products),
+        "product_name": np.char.add("Product", products)
+    }
+    names = [*columns, "quantity", "price"]
+    rows = zip(*(column.tolist() for column in columns.values()), repeat(1), repeat(100.0))
+    return orjson.dumps([dict(zip(names, row)) for row in rows])
+
+
+@pytest.fixture(scope="class")
+def large_batch_upload(api, api_ready, large_batch_payload):
+    """Upload the 1000 generated transactions once for the performance tests"""
+    # The payload is highly redundant JSON; gzip shrinks ~147 KB to ~3 KB
+    return api.post(f"{BASE_URL}/transactions?reset=1", data=gzip.compress(large_batch_payload),
+                    headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+
+
+@pytest.fixture(scope="class")
+def sample_responses(request, seeded_db):
+    """Fetch all of a class's SAMPLE_QUERIES concurrently, keyed by query string"""
+    queries = [case.values[0] for case in request.cls.SAMPLE_QUERIES]
+    path = request.cls.SAMPLE_QUERY_PATH
+    return dict(zip(queries, fetch_all([f"{BASE_URL}{path}?{qs}" for qs in queries])))
+
+
+@pytest.fixture(scope="class")
+def seeded_db(api, api_ready):
+    """Seed the sample data once for a class of read-only queries"""
+    # Tests using this are kept last in their class, so the class's
+    # empty-store and mutating tests run before the seed
+    seed_transactions(api)
 
 
 # ============================================================================
@@ -45,7 +132,7 @@ def sample_transactions():
 class TestUploadTransactions:
     """Test POST /api/transactions endpoint with edge cases"""
     
-    def test_upload_single_transaction(self, clean_db):
+    def test_upload_single_transaction(self, api, clean_db):
         """Test uploading a single transaction"""
         transaction = {
             "transaction_id": "T001",
@@ -57,26 +144,39 @@ class TestUploadTransactions:
             "price": 10.0
         }
         
-        response = requests.post(f"{BASE_URL}/transactions", json=transaction)
+        response = api.post(f"{BASE_URL}/transactions", json=transaction)
         assert response.status_code == 201
-        data = response.json()
+        data = parse(response)
         assert data['success'] == True
         assert data['total_transactions'] == 1
     
-    def test_upload_multiple_transactions_as_array(self, clean_db, sample_transactions):
+    def test_upload_multiple_transactions_as_array(self, api, clean_db, sample_transactions):
         """Test uploading array of transactions"""
-        response = requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
+        response = api.post(f"{BASE_URL}/transactions", json=sample_transactions)
         assert response.status_code == 201
-        data = response.json()
+        data = parse(response)
         assert data['success'] == True
         assert data['total_transactions'] == 3
     
-    def test_upload_empty_array(self, clean_db):
+    def test_upload_with_reset(self, api, clean_db, sample_transactions):
+        """Test reset=1 replaces existing transactions with the new batch"""
+        api.post(f"{BASE_URL}/transactions", json=sample_transactions)
+        
+        response = seed_transactions(api, sample_transactions[:1])
+        assert response.status_code == 201
+        assert parse(response)['total_transactions'] == 1
+        
+        # An entirely invalid batch must not wipe the store
+        response = api.post(f"{BASE_URL}/transactions?reset=1", json=[{"transaction_id": "T1"}])
+        assert response.status_code == 400
+        assert parse(api.get(f"{BASE_URL}/transactions"))['total_count'] == 1
+    
+    def test_upload_empty_array(self, api, clean_db):
         """Edge Case: Empty array"""
-        response = requests.post(f"{BASE_URL}/transactions", json=[])
+        response = api.post(f"{BASE_URL}/transactions", json=[])
         assert response.status_code == 400
     
-    def test_upload_missing_required_field(self, clean_db):
+    def test_upload_missing_required_field(self, api, clean_db):
         """Edge Case: Missing required field"""
         transaction = {
             "transaction_id": "T001",
@@ -84,10 +184,10 @@ class TestUploadTransactions:
             # Missing customer_name, product_id, etc.
         }
         
-        response = requests.post(f"{BASE_URL}/transactions", json=transaction)
+        response = api.post(f"{BASE_URL}/transactions", json=transaction)
         assert response.status_code == 400
     
-    def test_upload_zero_quantity(self, clean_db):
+    def test_upload_zero_quantity(self, api, clean_db):
         """Edge Case: Zero quantity (invalid)"""
         transaction = {
             "transaction_id": "T001",
@@ -99,10 +199,10 @@ class TestUploadTransactions:
             "price": 10.0
         }
         
-        response = requests.post(f"{BASE_URL}/transactions", json=transaction)
+        response = api.post(f"{BASE_URL}/transactions", json=transaction)
         assert response.status_code == 400
     
-    def test_upload_negative_quantity(self, clean_db):
+    def test_upload_negative_quantity(self, api, clean_db):
         """Edge Case: Negative quantity (invalid)"""
         transaction = {
             "transaction_id": "T001",
@@ -114,10 +214,10 @@ class TestUploadTransactions:
             "price": 10.0
         }
         
-        response = requests.post(f"{BASE_URL}/transactions", json=transaction)
+        response = api.post(f"{BASE_URL}/transactions", json=transaction)
         assert response.status_code == 400
     
-    def test_upload_negative_price(self, clean_db):
+    def test_upload_negative_price(self, api, clean_db):
         """Edge Case: Negative price (invalid)"""
         transaction = {
             "transaction_id": "T001",
@@ -129,10 +229,10 @@ class TestUploadTransactions:
             "price": -10.0  # Invalid
         }
         
-        response = requests.post(f"{BASE_URL}/transactions", json=transaction)
+        response = api.post(f"{BASE_URL}/transactions", json=transaction)
         assert response.status_code == 400
     
-    def test_upload_large_quantity(self, clean_db):
+    def test_upload_large_quantity(self, api, clean_db):
         """Edge Case: Very large quantity"""
         transaction = {
             "transaction_id": "T001",
@@ -144,10 +244,10 @@ class TestUploadTransactions:
             "price": 10.0
         }
         
-        response = requests.post(f"{BASE_URL}/transactions", json=transaction)
+        response = api.post(f"{BASE_URL}/transactions", json=transaction)
         assert response.status_code == 201
     
-    def test_upload_decimal_quantity(self, clean_db):
+    def test_upload_decimal_quantity(self, api, clean_db):
         """Edge Case: Decimal quantity (should be accepted)"""
         transaction = {
             "transaction_id": "T001",
@@ -159,8 +259,140 @@ class TestUploadTransactions:
             "price": 10.0
         }
         
-        response = requests.post(f"{BASE_URL}/transactions", json=transaction)
+        response = api.post(f"{BASE_URL}/transactions", json=transaction)
+        assert response.status_code == 201
+    
+    def test_upload_invalid_timestamp(self, api, clean_db):
+        """Edge Case: Unparseable timestamp (invalid)"""
+        transaction = {
+            "transaction_id": "T001",
+            "customer_id": "C001",
+            "customer_name": "John",
+            "product_id": "P001",
+            "product_name": "Item",
+            "quantity": 1,
+            "price": 10.0,
+            "timestamp": "not-a-date"  # Invalid
+        }
+        
+        response = api.post(f"{BASE_URL}/transactions", json=transaction)
+        assert response.status_code == 400
+    
+    @pytest.mark.parametrize("timestamp", ["9999-12-31T00:00:00", "1500-01-01T00:00:00"])
+    def test_upload_out_of_range_timestamp(self, api, clean_db, timestamp):
+        """Edge Case: Valid ISO timestamp outside the storable range (invalid)"""
+        transaction = {
+            "transaction_id": "T001",
+            "customer_id": "C001",
+            "customer_name": "John",
+            "product_id": "P001",
+            "product_name": "Item",
+            "quantity": 1,
+            "price": 10.0,
+            "timestamp": timestamp
+        }
+        
+        response = api.post(f"{BASE_URL}/transactions", json=transaction)
+        assert response.status_code == 400
+        assert parse(response)['errors'][0]['error'] == f"Timestamp out of range: {timestamp}"
+    
+    def test_upload_timestamp_with_offset(self, api, clean_db):
+        """Edge Case: An offset timestamp comes back as the same instant in explicit UTC"""
+        transaction = {
+            "transaction_id": "T001",
+            "customer_id": "C001",
+            "customer_name": "John",
+            "product_id": "P001",
+            "product_name": "Item",
+            "quantity": 1,
+            "price": 10.0,
+            "timestamp": "2026-02-05T10:30:00+05:00"
+        }
+        api.post(f"{BASE_URL}/transactions", json=transaction)
+        
+        data = parse(api.get(f"{BASE_URL}/transactions"))
+        assert data['data'][0]['timestamp'] == "2026-02-05T05:30:00+00:00"
+    
+    def test_upload_large_batch_with_invalid_records(self, api, clean_db):
+        """Edge Case: Invalid records inside a large (vectorized) batch"""
+        transactions = [
+            {"transaction_id": f"T{i:03d}", "customer_id": "C1", "customer_name": "A",
+             "product_id": "P1", "product_name": "Item", "quantity": 1, "price": 10.0}
+            for i in range(100)
+        ]
+        transactions[10]['quantity'] = 0
+        transactions[20]['price'] = -1.0
+        del transactions[30]['product_name']
+        
+        response = api.post(f"{BASE_URL}/transactions", json=transactions)
+        assert response.status_code == 201
+        data = parse(response)
+        assert data['total_transactions'] == 97
+        assert data['failed_count'] == 3
+        assert [e['index'] for e in data['errors']] == [10, 20, 30]
+        assert data['errors'][2]['error'] == "Missing required field: product_name"
+    
+    def test_upload_non_string_id(self, api, clean_db):
+        """Edge Case: A non-string ID fails its record; the rest of the batch is stored"""
+        transactions = [
+            {"transaction_id": "T1", "customer_id": "C1", "customer_name": "A",
+             "product_id": "PGHOST", "product_name": "Item", "quantity": 1, "price": 10.0},
+            {"transaction_id": "T2", "customer_id": "C1", "customer_name": "A",
+             "product_id": ["x"], "product_name": "Item", "quantity": 1, "price": 10.0}
+        ]
+        response = api.post(f"{BASE_URL}/transactions", json=transactions)
+        assert response.status_code == 201
+        assert parse(response)['errors'][0]['error'] == "product_id must be a string or integer"
+        
+        data = parse(api.get(f"{BASE_URL}/sales/by-product"))
+        assert [(p['product_id'], p['transaction_count']) for p in data['data']] == [("PGHOST", 1)]
+    
+    def test_upload_integer_ids(self, api, clean_db):
+        """Edge Case: Integer IDs upload and aggregate like string IDs"""
+        transactions = [
+            {"transaction_id": 1, "customer_id": 1001, "customer_name": "A",
+             "product_id": 42, "product_name": "Item", "quantity": 1, "price": 10.0},
+            {"transaction_id": 2, "customer_id": 1001, "customer_name": "A",
+             "product_id": 42, "product_name": "Item", "quantity": 2, "price": 10.0}
+        ]
+        response = api.post(f"{BASE_URL}/transactions", json=transactions)
         assert response.status_code == 201
+        assert 'errors' not in parse(response)
+        
+        sales = parse(api.get(f"{BASE_URL}/sales/by-product"))['data']
+        assert [(p['product_id'], p['total_sales']) for p in sales] == [(42, 30.0)]
+        customers = parse(api.get(f"{BASE_URL}/customers/top"))['data']
+        assert [(c['customer_id'], c['total_spent']) for c in customers] == [(1001, 30.0)]
+    
+    def test_upload_gzip_bomb(self, api, clean_db):
+        """Edge Case: A small gzip body that inflates past the size cap (rejected)"""
+        # ~65 MB of zeros compresses to ~64 KB; built in chunks to stay small here
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+        zeros = bytes(1 << 20)
+        body = b''.join(compressor.compress(zeros) for _ in range(65)) + compressor.flush()
+        
+        response = api.post(f"{BASE_URL}/transactions", data=body,
+                            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        assert response.status_code == 413
+        assert parse(api.get(f"{BASE_URL}/transactions"))['total_count'] == 0
+    
+    def test_upload_multi_member_gzip(self, api, clean_db, sample_transactions):
+        """Edge Case: A body of concatenated gzip members is inflated in full"""
+        payload = orjson.dumps(list(sample_transactions))
+        half = len(payload) // 2
+        body = gzip.compress(payload[:half]) + gzip.compress(payload[half:])
+        
+        response = api.post(f"{BASE_URL}/transactions", data=body,
+                            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        assert response.status_code == 201
+        assert parse(response)['total_transactions'] == 3
+    
+    def test_upload_malformed_gzip(self, api, clean_db):
+        """Edge Case: Content-Encoding: gzip on a body that is not gzip (invalid)"""
+        response = api.post(f"{BASE_URL}/transactions", data=b'{"transaction_id": "T1"}',
+                            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        assert response.status_code == 400
+        assert parse(response)['success'] == False
 
 
 # ============================================================================
@@ -170,15 +402,16 @@ class TestUploadTransactions:
 class TestSalesByProduct:
     """Test GET /api/sales/by-product endpoint with edge cases"""
     
-    def test_sales_empty_database(self, clean_database):
+    @pytest.mark.empty_store
+    def test_sales_empty_database(self, api, clean_database):
         """Edge Case: No transactions in database"""
-        response = requests.get(f"{BASE_URL}/sales/by-product")
+        response = api.get(f"{BASE_URL}/sales/by-product")
         assert response.status_code == 200
-        data = response.json()
+        data = parse(response)
         assert data['count'] == 0
         assert data['data'] == []
     
-    def test_sales_single_product(self, clean_database):
+    def test_sales_single_product(self, api):
         """Edge Case: Only one product"""
         transaction = {
             "transaction_id": "T001",
@@ -189,42 +422,42 @@ class TestSalesByProduct:
             "quantity": 2,
             "price": 1000.0
         }
-        requests.post(f"{BASE_URL}/transactions", json=transaction)
+        seed_transactions(api, [transaction])
         
-        response = requests.get(f"{BASE_URL}/sales/by-product")
+        response = api.get(f"{BASE_URL}/sales/by-product")
         assert response.status_code == 200
-        data = response.json()
+        data = parse(response)
         assert data['count'] == 1
         assert data['data'][0]['total_sales'] == 2000.0
     
-    def test_sales_sort_by_sales_desc(self, clean_database, sample_transactions):
+    def test_sales_sort_by_sales_desc(self, api):
         """Test sorting by sales descending"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
+        seed_transactions(api)
         
-        response = requests.get(f"{BASE_URL}/sales/by-product?sort_by=sales&order=desc")
+        response = api.get(f"{BASE_URL}/sales/by-product?sort_by=sales&order=desc")
         assert response.status_code == 200
-        data = response.json()
+        data = parse(response)
         
         # Should be sorted descending
         assert data['data'][0]['total_sales'] >= data['data'][1]['total_sales']
     
-    def test_sales_sort_by_quantity(self, clean_database, sample_transactions):
+    def test_sales_sort_by_quantity(self, api):
         """Test sorting by quantity"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
+        seed_transactions(api)
         
-        response = requests.get(f"{BASE_URL}/sales/by-product?sort_by=quantity&order=desc")
+        response = api.get(f"{BASE_URL}/sales/by-product?sort_by=quantity&order=desc")
         assert response.status_code == 200
     
-    def test_sales_with_limit(self, clean_database, sample_transactions):
+    def test_sales_with_limit(self, api):
         """Test limit parameter"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
+        seed_transactions(api)
         
-        response = requests.get(f"{BASE_URL}/sales/by-product?limit=1")
+        response = api.get(f"{BASE_URL}/sales/by-product?limit=1")
         assert response.status_code == 200
-        data = response.json()
+        data = parse(response)
         assert data['count'] == 1
     
-    def test_sales_same_product_multiple_transactions(self, clean_database):
+    def test_sales_same_product_multiple_transactions(self, api):
         """Edge Case: Multiple transactions for same product"""
         transactions = [
             {"transaction_id": "T1", "customer_id": "C1", "customer_name": "A",
@@ -234,15 +467,39 @@ class TestSalesByProduct:
             {"transaction_id": "T3", "customer_id": "C3", "customer_name": "C",
              "product_id": "P1", "product_name": "Item", "quantity": 3, "price": 10.0}
         ]
-        requests.post(f"{BASE_URL}/transactions", json=transactions)
+        seed_transactions(api, transactions)
         
-        response = requests.get(f"{BASE_URL}/sales/by-product")
-        data = response.json()
+        response = api.get(f"{BASE_URL}/sales/by-product")
+        data = parse(response)
         
         assert data['count'] == 1
         assert data['data'][0]['total_quantity'] == 6
+        assert isinstance(data['data'][0]['total_quantity'], int)
         assert data['data'][0]['total_sales'] == 60.0
         assert data['data'][0]['transaction_count'] == 3
+    
+    def test_cached_aggregates_follow_writes(self, api):
+        """Cached aggregate responses are replaced after a POST, reset and DELETE"""
+        def totals():
+            sales = parse(api.get(f"{BASE_URL}/sales/by-product"))['data']
+            customers = parse(api.get(f"{BASE_URL}/customers/top"))['data']
+            return ([(p['product_id'], p['total_sales']) for p in sales],
+                    [(c['customer_id'], c['total_spent']) for c in customers])
+        
+        transaction = {"transaction_id": "T1", "customer_id": "C1", "customer_name": "A",
+                       "product_id": "P1", "product_name": "Item", "quantity": 1, "price": 10.0}
+        seed_transactions(api, [transaction])
+        assert totals() == ([("P1", 10.0)], [("C1", 10.0)])
+        
+        api.post(f"{BASE_URL}/transactions", json={**transaction, "transaction_id": "T2"})
+        assert totals() == ([("P1", 20.0)], [("C1", 20.0)])
+        
+        seed_transactions(api)
+        assert totals() == ([("PROD001", 3000.0), ("PROD002", 50.0)],
+                            [("CUST001", 2050.0), ("CUST002", 1000.0)])
+        
+        api.delete(f"{BASE_URL}/transactions")
+        assert totals() == ([], [])
 
 
 # ============================================================================
@@ -252,15 +509,29 @@ class TestSalesByProduct:
 class TestTopCustomers:
     """Test GET /api/customers/top endpoint with edge cases"""
     
-    def test_customers_empty_database(self, clean_database):
+    # Read-only queries against the sample set, fetched together by sample_responses
+    SAMPLE_QUERY_PATH = "/customers/top"
+    SAMPLE_QUERIES = [
+        pytest.param("limit=1", lambda data: data['count'] == 1, id="with_limit"),
+        # Only Alice spent >= 2000
+        pytest.param("min_spent=2000", lambda data: data['count'] == 1
+                     and data['data'][0]['customer_name'] == "Alice", id="min_spent_filter"),
+        pytest.param("min_spent=0", lambda data: data['count'] == 2, id="min_spent_zero"),
+        # Laptop and Mouse
+        pytest.param("format=map", lambda data: data['data']['CUST001']['unique_products_count'] == 2,
+                     id="unique_products_count"),
+    ]
+    
+    @pytest.mark.empty_store
+    def test_customers_empty_database(self, api, clean_database):
         """Edge Case: No customers"""
-        response = requests.get(f"{BASE_URL}/customers/top")
+        response = api.get(f"{BASE_URL}/customers/top")
         assert response.status_code == 200
-        data = response.json()
+        data = parse(response)
         assert data['count'] == 0
         assert data['data'] == []
     
-    def test_customers_single_customer(self, clean_database):
+    def test_customers_single_customer(self, api):
         """Edge Case: Only one customer"""
         transaction = {
             "transaction_id": "T001",
@@ -271,55 +542,15 @@ class TestTopCustomers:
             "quantity": 1,
             "price": 1000.0
         }
-        requests.post(f"{BASE_URL}/transactions", json=transaction)
+        seed_transactions(api, [transaction])
         
-        response = requests.get(f"{BASE_URL}/customers/top")
+        response = api.get(f"{BASE_URL}/customers/top")
         assert response.status_code == 200
-        data = response.json()
+        data = parse(response)
         assert data['count'] == 1
         assert data['data'][0]['total_spent'] == 1000.0
     
-    def test_customers_with_limit(self, clean_database, sample_transactions):
-        """Test limit parameter"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
-        
-        response = requests.get(f"{BASE_URL}/customers/top?limit=1")
-        assert response.status_code == 200
-        data = response.json()
-        assert data['count'] == 1
-    
-    def test_customers_min_spent_filter(self, clean_database, sample_transactions):
-        """Test minimum spending filter"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
-        
-        response = requests.get(f"{BASE_URL}/customers/top?min_spent=2000")
-        assert response.status_code == 200
-        data = response.json()
-        
-        # Only Alice spent >= 2000
-        assert data['count'] == 1
-        assert data['data'][0]['customer_name'] == "Alice"
-    
-    def test_customers_min_spent_zero(self, clean_database, sample_transactions):
-        """Edge Case: min_spent = 0 (all customers)"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
-        
-        response = requests.get(f"{BASE_URL}/customers/top?min_spent=0")
-        assert response.status_code == 200
-        data = response.json()
-        assert data['count'] == 2  # Both customers
-    
-    def test_customers_unique_products_count(self, clean_database, sample_transactions):
-        """Test unique products count calculation"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
-        
-        response = requests.get(f"{BASE_URL}/customers/top")
-        data = response.json()
-        
-        alice = next(c for c in data['data'] if c['customer_name'] == 'Alice')
-        assert alice['unique_products_count'] == 2  # Laptop and Mouse
-    
-    def test_customers_average_transaction(self, clean_database):
+    def test_customers_average_transaction(self, api):
         """Test average transaction calculation"""
         transactions = [
             {"transaction_id": "T1", "customer_id": "C1", "customer_name": "Alice",
@@ -327,13 +558,36 @@ class TestTopCustomers:
             {"transaction_id": "T2", "customer_id": "C1", "customer_name": "Alice",
              "product_id": "P2", "product_name": "Item2", "quantity": 1, "price": 200.0}
         ]
-        requests.post(f"{BASE_URL}/transactions", json=transactions)
+        seed_transactions(api, transactions)
         
-        response = requests.get(f"{BASE_URL}/customers/top")
-        data = response.json()
+        response = api.get(f"{BASE_URL}/customers/top")
+        data = parse(response)
         
         assert data['data'][0]['total_spent'] == 300.0
         assert data['data'][0]['average_transaction'] == 150.0
+    
+    def test_customers_products_use_row_names(self, api):
+        """Edge Case: One product ID uploaded under two names counts both names"""
+        transactions = [
+            {"transaction_id": "T1", "customer_id": "C1", "customer_name": "Alice",
+             "product_id": "P1", "product_name": "Laptop", "quantity": 1, "price": 100.0},
+            {"transaction_id": "T2", "customer_id": "C1", "customer_name": "Alice",
+             "product_id": "P1", "product_name": "Laptop Pro", "quantity": 1, "price": 200.0}
+        ]
+        seed_transactions(api, transactions)
+        
+        response = api.get(f"{BASE_URL}/customers/top")
+        data = parse(response)
+        
+        assert sorted(data['data'][0]['products_purchased']) == ["Laptop", "Laptop Pro"]
+        assert data['data'][0]['unique_products_count'] == 2
+    
+    @pytest.mark.parametrize("qs,check", SAMPLE_QUERIES)
+    def test_customers_sample_queries(self, sample_responses, qs, check):
+        """Test top-customer queries against the shared sample dataset"""
+        response = sample_responses[qs]
+        assert response.status_code == 200
+        assert check(parse(response))
 
 
 # ============================================================================
@@ -343,89 +597,78 @@ class TestTopCustomers:
 class TestFilterTransactions:
     """Test GET /api/transactions/filter endpoint with edge cases"""
     
-    def test_filter_empty_database(self, clean_database):
+    # Read-only queries against the sample set, fetched together by sample_responses
+    SAMPLE_QUERY_PATH = "/transactions/filter"
+    SAMPLE_QUERIES = [
+        pytest.param("customer_id=NONEXISTENT", lambda data: data['count'] == 0,
+                     id="by_customer_no_match"),
+        # Alice has 2 transactions
+        pytest.param("customer_id=CUST001", lambda data: data['count'] == 2, id="by_customer"),
+        # Laptop appears twice
+        pytest.param("product_id=PROD001", lambda data: data['count'] == 2, id="by_product"),
+        # Amount predicates run server-side; count_only returns just the counts
+        pytest.param("min_amount=100&count_only=1", lambda data: data['count'] == 2
+                     and 'data' not in data, id="by_min_amount"),
+        pytest.param("max_amount=100&count_only=1", lambda data: data['count'] == 1,
+                     id="by_max_amount"),
+        pytest.param("min_amount=50&max_amount=1500&count_only=1",
+                     lambda data: data['count'] == 2, id="by_amount_range"),
+        # Alice's transactions with amount >= 100
+        pytest.param("customer_id=CUST001&min_amount=100&count_only=1",
+                     lambda data: data['count'] == 1, id="combined_filters"),
+        # 2000 + 50
+        pytest.param("customer_id=CUST001", lambda data: data['total_amount'] == 2050.0,
+                     id="total_amount_calculation"),
+    ]
+    
+    @pytest.mark.empty_store
+    def test_filter_empty_database(self, api, clean_database):
         """Edge Case: Filter on empty database"""
-        response = requests.get(f"{BASE_URL}/transactions/filter?customer_id=C001")
-        assert response.status_code == 200
-        data = response.json()
-        assert data['count'] == 0
-    
-    def test_filter_by_customer_no_match(self, clean_database, sample_transactions):
-        """Edge Case: Filter with no matching results"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
-        
-        response = requests.get(f"{BASE_URL}/transactions/filter?customer_id=NONEXISTENT")
+        response = api.get(f"{BASE_URL}/transactions/filter?customer_id=C001")
         assert response.status_code == 200
-        data = response.json()
+        data = parse(response)
         assert data['count'] == 0
     
-    def test_filter_by_customer(self, clean_database, sample_transactions):
-        """Test filtering by customer"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
-        
-        response = requests.get(f"{BASE_URL}/transactions/filter?customer_id=CUST001")
-        assert response.status_code == 200
-        data = response.json()
-        assert data['count'] == 2  # Alice has 2 transactions
-    
-    def test_filter_by_product(self, clean_database, sample_transactions):
-        """Test filtering by product"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
-        
-        response = requests.get(f"{BASE_URL}/transactions/filter?product_id=PROD001")
-        assert response.status_code == 200
-        data = response.json()
-        assert data['count'] == 2  # Laptop appears twice
-    
-    def test_filter_by_min_amount(self, clean_database, sample_transactions):
-        """Test filtering by minimum amount"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
-        
-        response = requests.get(f"{BASE_URL}/transactions/filter?min_amount=100")
-        assert response.status_code == 200
-        data = response.json()
-        assert all(t['total_amount'] >= 100 for t in data['data'])
-    
-    def test_filter_by_max_amount(self, clean_database, sample_transactions):
-        """Test filtering by maximum amount"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
+    def test_filter_by_date_range(self, api):
+        """Test filtering by start and end date"""
+        transactions = [
+            {"transaction_id": f"T{day}", "customer_id": "C1", "customer_name": "A",
+             "product_id": "P1", "product_name": "Item", "quantity": 1, "price": 10.0,
+             "timestamp": f"2026-02-{day:02d}T12:00:00"}
+            for day in range(1, 11)
+        ]
+        seed_transactions(api, transactions)
         
-        response = requests.get(f"{BASE_URL}/transactions/filter?max_amount=100")
+        response = api.get(
+            f"{BASE_URL}/transactions/filter?start_date=2026-02-03&end_date=2026-02-06T12:00:00"
+        )
         assert response.status_code == 200
-        data = response.json()
-        assert all(t['total_amount'] <= 100 for t in data['data'])
+        data = parse(response)
+        assert data['count'] == 4  # Feb 3, 4, 5 and 6
+        assert data['data'][0]['timestamp'] == "2026-02-03T12:00:00"
     
-    def test_filter_by_amount_range(self, clean_database, sample_transactions):
-        """Test filtering by amount range"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
+    def test_filter_pagination(self, api):
+        """Test limit/offset return one page while totals cover all matches"""
+        transactions = [
+            {"transaction_id": f"T{i}", "customer_id": "C1", "customer_name": "A",
+             "product_id": "P1", "product_name": "Item", "quantity": 1, "price": 10.0}
+            for i in range(10)
+        ]
+        seed_transactions(api, transactions)
         
-        response = requests.get(f"{BASE_URL}/transactions/filter?min_amount=50&max_amount=1500")
-        assert response.status_code == 200
-        data = response.json()
-        assert all(50 <= t['total_amount'] <= 1500 for t in data['data'])
+        response = api.get(f"{BASE_URL}/transactions/filter?customer_id=C1&limit=3&offset=4")
+        data = parse(response)
+        assert data['count'] == 3
+        assert data['total_count'] == 10
+        assert data['total_amount'] == 100.0
+        assert [t['transaction_id'] for t in data['data']] == ["T4", "T5", "T6"]
     
-    def test_filter_combined_filters(self, clean_database, sample_transactions):
-        """Edge Case: Multiple filters combined"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
-        
-        response = requests.get(
-            f"{BASE_URL}/transactions/filter?customer_id=CUST001&min_amount=100"
-        )
+    @pytest.mark.parametrize("qs,check", SAMPLE_QUERIES)
+    def test_filter_sample_queries(self, sample_responses, qs, check):
+        """Test filter queries against the shared sample dataset"""
+        response = sample_responses[qs]
         assert response.status_code == 200
-        data = response.json()
-        
-        # Should match Alice's transactions with amount >= 100
-        assert all(t['customer_id'] == 'CUST001' for t in data['data'])
-        assert all(t['total_amount'] >= 100 for t in data['data'])
-    
-    def test_filter_total_amount_calculation(self, clean_database, sample_transactions):
-        """Test that total_amount is calculated correctly in filter"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
-        
-        response = requests.get(f"{BASE_URL}/transactions/filter?customer_id=CUST001")
-        data = response.json()
-        
-        assert data['total_amount'] == 2050.0  # 2000 + 50
+        assert check(parse(response))
 
 
 # ============================================================================
@@ -435,48 +678,108 @@ class TestFilterTransactions:
 class TestUtilityEndpoints:
     """Test utility endpoints with edge cases"""
     
-    def test_get_all_empty(self, clean_database):
+    @pytest.mark.empty_store
+    def test_get_all_empty(self, api, clean_database):
         """Edge Case: Get all from empty database"""
-        response = requests.get(f"{BASE_URL}/transactions")
+        response = api.get(f"{BASE_URL}/transactions")
         assert response.status_code == 200
-        data = response.json()
+        data = parse(response)
         assert data['total_count'] == 0
         assert data['data'] == []
     
-    def test_get_all_with_pagination(self, clean_database):
+    def test_get_all_with_pagination(self, api):
         """Test pagination"""
         transactions = [
             {"transaction_id": f"T{i}", "customer_id": "C1", "customer_name": "A",
              "product_id": "P1", "product_name": "Item", "quantity": 1, "price": 10.0}
             for i in range(10)
         ]
-        requests.post(f"{BASE_URL}/transactions", json=transactions)
+        seed_transactions(api, transactions)
         
-        response = requests.get(f"{BASE_URL}/transactions?limit=5&offset=0")
-        data = response.json()
+        response = api.get(f"{BASE_URL}/transactions?limit=5&offset=0")
+        data = parse(response)
         assert data['count'] == 5
         assert data['total_count'] == 10
     
-    def test_health_check(self):
+    def test_health_check(self, api):
         """Test health check endpoint"""
-        response = requests.get(f"{BASE_URL}/health")
+        response = api.get(f"{BASE_URL}/health")
         assert response.status_code == 200
-        data = response.json()
+        data = parse(response)
         assert 'status' in data
         assert data['status'] == 'healthy'
     
-    def test_clear_transactions(self, clean_database, sample_transactions):
+    def test_clear_transactions(self, api):
         """Test clearing all transactions"""
-        requests.post(f"{BASE_URL}/transactions", json=sample_transactions)
+        seed_transactions(api)
         
-        response = requests.delete(f"{BASE_URL}/transactions")
+        response = api.delete(f"{BASE_URL}/transactions")
         assert response.status_code == 200
-        data = response.json()
+        data = parse(response)
         assert data['success'] == True
         
         # Verify database is empty
-        check = requests.get(f"{BASE_URL}/transactions")
-        assert check.json()['total_count'] == 0
+        check = api.get(f"{BASE_URL}/transactions")
+        assert parse(check)['total_count'] == 0
+    
+    def test_export_parquet(self, api):
+        """Test exporting transactions as a Parquet file"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        seed_transactions(api)
+        
+        response = api.get(f"{BASE_URL}/transactions/export")
+        assert response.status_code == 200
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.num_rows == 3
+        assert table.column('customer_id').to_pylist() == ['CUST001', 'CUST001', 'CUST002']
+        assert sum(table.column('total_amount').to_pylist()) == 3050.0
+    
+    def test_export_parquet_mixed_id_types(self, api):
+        """Edge Case: String and integer IDs in one store export as strings"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        transactions = [
+            {"transaction_id": 1, "customer_id": 1001, "customer_name": "A",
+             "product_id": "P1", "product_name": "Item", "quantity": 1, "price": 10.0},
+            {"transaction_id": "T2", "customer_id": "C2", "customer_name": "B",
+             "product_id": 42, "product_name": "Item", "quantity": 1, "price": 10.0}
+        ]
+        seed_transactions(api, transactions)
+        
+        response = api.get(f"{BASE_URL}/transactions/export")
+        assert response.status_code == 200
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.column('transaction_id').to_pylist() == ['1', 'T2']
+        assert table.column('customer_id').to_pylist() == ['1001', 'C2']
+        assert table.column('product_id').to_pylist() == ['P1', '42']
+
+
+# ============================================================================
+# TEST: Test Data Generator
+# ============================================================================
+
+class TestGenerateTestData:
+    """Test the generate_test_data helper"""
+    
+    def test_same_seed_same_data(self):
+        """The same seed always yields the same transactions"""
+        assert generate_test_data(50, seed=7) == generate_test_data(50, seed=7)
+        assert generate_test_data(50, seed=7) != generate_test_data(50, seed=8)
+    
+    def test_record_fields(self):
+        """Records carry valid, consistently typed fields"""
+        transactions = generate_test_data(24)
+        assert [t['transaction_id'] for t in transactions[:2]] == ["TXN00001", "TXN00002"]
+        for t in transactions:
+            assert all(isinstance(t[field], str) for field in
+                       ("customer_id", "customer_name", "product_id", "product_name"))
+            assert isinstance(t['quantity'], int) and 1 <= t['quantity'] <= 10
+            assert isinstance(t['price'], float)
+            assert t['total_amount'] == t['price'] * t['quantity']
+        # Hourly timestamps from a fixed start
+        timestamps = [datetime.fromisoformat(t['timestamp']) for t in transactions]
+        assert timestamps[0] == datetime(2026, 1, 1)
+        assert transactions[1]['timestamp'] == datetime(2026, 1, 1, 1).isoformat()
+        assert timestamps[-1] - timestamps[0] == timedelta(hours=23)
 
 
 # ============================================================================
@@ -486,44 +789,56 @@ class TestUtilityEndpoints:
 class TestPerformance:
     """Performance and stress testing"""
     
-    def test_large_batch_upload(self, clean_database):
+    def test_large_batch_upload(self, large_batch_upload):
         """Stress Test: Upload 1000 transactions"""
-        transactions = [
-            {
-                "transaction_id": f"T{i:05d}",
-                "customer_id": f"C{i % 10}",
-                "customer_name": f"Customer{i % 10}",
-                "product_id": f"P{i % 20}",
-                "product_name": f"Product{i % 20}",
-                "quantity": 1,
-                "price": 100.0
-            }
-            for i in range(1000)
-        ]
+        assert large_batch_upload.status_code == 201
+        assert parse(large_batch_upload)['total_transactions'] == 1000
+    
+    def test_aggregation_smoke(self, api, large_batch_upload):
+        """Smoke Test: Aggregation over HTTP on 1000 transactions"""
+        response = api.get(f"{BASE_URL}/sales/by-product")
+        assert response.status_code == 200
+        assert parse(response)['count'] == 20
+    
+    def test_aggregation_performance(self, large_batch_payload):
+        """Performance Test: Aggregation on 1000 transactions, timed in-process"""
+        # The Flask test client skips sockets and the client-side decode, so
+        # only the server's own work is measured (against its own store)
+        client = app.test_client()
+        client.post("/api/transactions?reset=1", data=large_batch_payload,
+                    content_type="application/json")
+        try:
+            start = time.perf_counter()
+            response = client.get("/api/sales/by-product")
+            elapsed = time.perf_counter() - start
+        finally:
+            client.delete("/api/transactions")
         
-        response = requests.post(f"{BASE_URL}/transactions", json=transactions)
-        assert response.status_code == 201
-        assert response.json()['total_transactions'] == 1000
+        assert response.status_code == 200
+        assert elapsed < 1.0  # Should be fast
     
-    def test_aggregation_performance(self, clean_database):
-        """Performance Test: Aggregation on 1000 transactions"""
+    def test_single_row_insert_on_large_store(self):
+        """Performance Test: Publishing one row must not copy every group's aggregates"""
+        # 50k customers x 8k product names: a full bit-matrix copy is ~50 MB
         transactions = [
-            {
-                "transaction_id": f"T{i:05d}",
-                "customer_id": f"C{i % 10}",
-                "customer_name": f"Customer{i % 10}",
-                "product_id": f"P{i % 20}",
-                "product_name": f"Product{i % 20}",
-                "quantity": 1,
-                "price": 100.0
-            }
-            for i in range(1000)
+            {"transaction_id": f"T{i}", "customer_id": f"C{i}", "customer_name": "A",
+             "product_id": f"P{i % 8000}", "product_name": f"Item{i % 8000}",
+             "quantity": 1, "price": 1.0}
+            for i in range(50000)
         ]
-        requests.post(f"{BASE_URL}/transactions", json=transactions)
-        
-        response = requests.get(f"{BASE_URL}/sales/by-product")
-        assert response.status_code == 200
-        assert response.elapsed.total_seconds() < 1.0  # Should be fast
+        db = TransactionDB()
+        db.append_batch(*validate_batch(transactions)[:2])
+        
+        timings = []
+        for i in range(20):
+            row = {**transactions[i], "transaction_id": f"X{i}"}
+            valid, columns, _ = validate_batch([row])
+            start = time.perf_counter()
+            db.append_batch(valid, columns)
+            timings.append(time.perf_counter() - start)
+        
+        assert len(db) == 50020
+        assert sorted(timings)[len(timings) // 2] < 0.005
 
 
 # ============================================================================
@@ -3,22 +3,78 @@ Shared Test Utilities for Sales Analytics API Testing
 Common functions, fixtures, and test data generators
 """
 
+import asyncio
 import requests
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
-import random
+import urllib3
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence
+from datetime import datetime
+
+import numpy as np
+import orjson
+
+try:
+    import httpx
+except ImportError:  # httpx is optional; fetch_all falls back to sequential GETs
+    httpx = None
 
 # Base URL for the API
 BASE_URL = "http://127.0.0.1:5000/api"
 
+# Fixed start of generated timestamps, so a seed always yields the same data
+TEST_DATA_START = datetime(2026, 1, 1)
+
+
+class CachingSession(requests.Session):
+    """
+    requests.Session that memoizes successful GET responses until the next write.
+    
+    The LRU is shared by every instance, so a POST/DELETE through any
+    session - test fixtures and the helpers below alike - invalidates it.
+    """
+    
+    MAX_ENTRIES = 256
+    _cache: "OrderedDict[str, requests.Response]" = OrderedDict()
+    
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop every cached response (call after writes made outside a session)"""
+        cls._cache.clear()
+    
+    def request(self, method, url, params=None, **kwargs):
+        cache = CachingSession._cache
+        if method.upper() != "GET":
+            cache.clear()
+            return super().request(method, url, params=params, **kwargs)
+        
+        key = requests.Request("GET", url, params=params).prepare().url
+        response = cache.get(key)
+        if response is not None:
+            cache.move_to_end(key)
+            return response
+        
+        response = super().request(method, url, params=params, **kwargs)
+        if response.status_code == 200:
+            cache[key] = response
+            if len(cache) > self.MAX_ENTRIES:
+                cache.popitem(last=False)
+        return response
+
+
+# Shared session so helper calls reuse keep-alive connections
+_SESSION = CachingSession()
+
+# The hottest write helpers skip requests' per-call machinery entirely
+_POOL = urllib3.PoolManager(num_pools=4, maxsize=16)
+
 
 def get_base_url() -> str:
     """Get API base URL"""
     return BASE_URL
 
 
-def generate_test_data(num_transactions: int = 1000) -> List[Dict[str, Any]]:
-    """Generate realistic test data for benchmarking and testing"""
+def generate_test_data(num_transactions: int = 1000, seed: int = 0) -> List[Dict[str, Any]]:
+    """Generate realistic, reproducible test data for benchmarking and testing"""
     products = [
         ("PROD001", "Laptop", 1200.00),
         ("PROD002", "Mouse", 25.00),
@@ -45,14 +101,31 @@ def generate_test_data(num_transactions: int = 1000) -> List[Dict[str, Any]]:
         ("CUST010", "Hannah Montana")
     ]
     
-    transactions = []
-    base_date = datetime.now() - timedelta(days=30)
+    # Draw every pick in three vectorized RNG calls instead of per row
+    rng = np.random.default_rng(seed)
+    product_picks = rng.integers(0, len(products), num_transactions)
+    customer_picks = rng.integers(0, len(customers), num_transactions)
+    quantities = rng.integers(1, 11, num_transactions)
     
-    for i in range(num_transactions):
-        product_id, product_name, price = random.choice(products)
-        customer_id, customer_name = random.choice(customers)
-        quantity = random.randint(1, 10)
-        
+    # Gather each field as a column from the picked indices, so rows are
+    # only zipped together - no per-row tuple lookups or arithmetic
+    product_ids, product_names, prices = (np.array(column)[product_picks]
+                                          for column in zip(*products))
+    customer_ids, customer_names = (np.array(column)[customer_picks]
+                                    for column in zip(*customers))
+    totals = prices * quantities
+    
+    # Hourly timestamps as one datetime64 arange, formatted in a single call;
+    # second resolution matches datetime.isoformat() for whole seconds
+    hours = np.arange(num_transactions) * np.timedelta64(1, 'h')
+    timestamps = np.datetime_as_string(np.datetime64(TEST_DATA_START, 's') + hours)
+    
+    columns = (customer_ids, customer_names, product_ids, product_names,
+               quantities, prices, totals, timestamps)
+    rows = zip(*(column.tolist() for column in columns))
+    transactions = []
+    for i, (customer_id, customer_name, product_id, product_name,
+            quantity, price, total_amount, timestamp) in enumerate(rows):
         transactions.append({
             "transaction_id": f"TXN{i+1:05d}",
             "customer_id": customer_id,
@@ -61,8 +134,8 @@ def generate_test_data(num_transactions: int = 1000) -> List[Dict[str, Any]]:
             "product_name": product_name,
             "quantity": quantity,
             "price_per_unit": price,
-            "total_amount": price * quantity,
-            "timestamp": (base_date + timedelta(hours=i)).isoformat(),
+            "total_amount": total_amount,
+            "timestamp": timestamp,
             "price": price
         })
     
@@ -102,22 +175,61 @@ def get_sample_transactions() -> List[Dict[str, Any]]:
     ]
 
 
+def parse(response: Any) -> Any:
+    """Decode a JSON response body with orjson instead of the stdlib decoder"""
+    return orjson.loads(response.content)
+
+
+# The sample set is encoded once at import; seeding reuses these bytes
+SAMPLE_TX_BYTES = orjson.dumps(get_sample_transactions())
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _write(method: str, path: str, body: Optional[bytes] = None) -> urllib3.HTTPResponse:
+    """Send a write straight through urllib3 and invalidate cached GETs"""
+    CachingSession.invalidate()
+    headers = JSON_HEADERS if body is not None else None
+    return _POOL.request(method, f"{BASE_URL}{path}", body=body, headers=headers)
+
+
 def clear_database() -> Dict[str, Any]:
     """Clear all transactions from database"""
-    response = requests.delete(f"{BASE_URL}/transactions")
-    return response.json() if response.status_code == 200 else {}
+    response = _write("DELETE", "/transactions")
+    return orjson.loads(response.data) if response.status == 200 else {}
 
 
 def upload_transactions(transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Upload transactions to API"""
-    response = requests.post(f"{BASE_URL}/transactions", json=transactions)
-    return response.json() if response.status_code in [200, 201] else {}
+    response = _write("POST", "/transactions", orjson.dumps(transactions))
+    return orjson.loads(response.data) if response.status in [200, 201] else {}
+
+
+def seed_transactions(api: requests.Session,
+                      transactions: Optional[Sequence[Dict[str, Any]]] = None) -> requests.Response:
+    """Replace all server data with `transactions` (default: the sample set) in a single POST"""
+    body = SAMPLE_TX_BYTES if transactions is None else orjson.dumps(list(transactions))
+    return api.post(f"{BASE_URL}/transactions?reset=1", data=body, headers=JSON_HEADERS)
+
+
+async def _fetch_all(urls: Sequence[str]) -> List[Any]:
+    limits = httpx.Limits(max_connections=len(urls) or 1)
+    async with httpx.AsyncClient(limits=limits) as client:
+        return await asyncio.gather(*(client.get(url) for url in urls))
+
+
+def fetch_all(urls: Sequence[str]) -> List[Any]:
+    """GET independent URLs concurrently, so N requests cost about one round trip"""
+    if httpx is None:
+        return [_SESSION.get(url) for url in urls]
+    return asyncio.run(_fetch_all(urls))
 
 
 def check_server_health() -> bool:
     """Check if API server is running"""
+    # Probe through the pool, never the caching session: a cached 200
+    # would keep reporting a dead server as healthy
     try:
-        response = requests.get(f"{BASE_URL}/health", timeout=2)
-        return response.status_code == 200
+        response = _POOL.request("GET", f"{BASE_URL}/health", timeout=2.0, retries=False)
+        return response.status == 200
     except:
         return False